@@ -3,7 +3,7 @@ import logging
 import logging.config
 import os, sys
 
-from hammerhal.compilers import HeroCompiler, AdversaryCompiler
+from hammerhal.compilers import CompilerBase, CompilerError, HeroCompiler, AdversaryCompiler, FontPreloader, BuildManifest, CardBuilder, BuildPool, ScaledImageCache
 from hammerhal import ConfigLoader
 
 def setup_logging(
@@ -33,6 +33,9 @@ def start(argv=sys.argv):
     logger.info("Logger started")
     ConfigLoader.load_configs()
 
+    # Scripted runs cannot confirm the matches, the best one is used
+    CompilerBase.interactive = sys.stdin.isatty()
+
     if (argv == sys.argv):
         if (len(argv) > 1):
             args = argv[1:]
@@ -52,10 +55,30 @@ def start(argv=sys.argv):
 def run_command(logger, args):
     command = args[0].strip().lower()
 
-    arg = (' '.join(args[1:]) if len(args) > 1 else '').strip().lower()
+    # Options are given as '--name=value' or '--flag' anywhere after the command
+    options = { }
+    _args = [ ]
+    for _arg in args[1:]:
+        if (_arg.startswith('--')):
+            key, _, value = _arg[2:].partition('=')
+            options[key.strip().lower().replace('-', '_')] = value.strip() if _ else True
+        else:
+            _args.append(_arg)
+
+    arg = ' '.join(_args).strip().lower()
     if (command in commands):
-        logger.debug("Running command '{command}' with arguments '{arg}'".format(command=command, arg=arg))
-        return commands[command](logger, arg)
+        error = check_options(command, options)
+        if (error):
+            logger.error(error)
+            print_help(logger)
+            return 3
+
+        logger.debug("Running command '{command}' with arguments '{arg}' and options {options}".format(command=command, arg=arg, options=options))
+        try:
+            return commands[command](logger, arg, **options)
+        except CompilerError as e:
+            logger.error(str(e))
+            return 1
     elif (command == 'exit'):
         logger.debug("Exiting now")
         return 0
@@ -64,58 +87,165 @@ def run_command(logger, args):
         print_help(logger)
         return 3
 
-def compile_all(logger, *args):
-    e_code = 0
-    e_code += compile_heroes(logger)
-    e_code += compile_adversaries(logger)
+# Returns the error message if any of the options is not supported by the command or has a wrong value, None otherwise
+def check_options(command, options):
+    supported = command_options.get(command, { })
+    for key, value in options.items():
+        kind = supported.get(key, None)
+        if (kind is None):
+            return "Unsupported option for command '{command}': --{key}".format(command=command, key=key.replace('_', '-'))
+        elif (kind == OPTION_VALUE and (value is True or not value)):
+            return "Option --{key} requires a value: --{key}=VALUE".format(key=key.replace('_', '-'))
+        elif (kind == OPTION_FLAG and value is not True):
+            return "Option --{key} does not take a value".format(key=key.replace('_', '-'))
+        elif (kind == OPTION_COUNT and value is not True and not (value.isdigit() and int(value) > 0)):
+            return "Option --{key} requires a positive number: '{value}'".format(key=key.replace('_', '-'), value=value)
+
+    return None
 
+def compile_all(logger, *args, profiles=None, force=False, jobs=None):
+    # Fonts are resolved while the raw files are validated
+    FontPreloader.start()
+
+    hero_compiler = HeroCompiler()
+    adversary_compiler = AdversaryCompiler()
+    invalid = validate_raw_files(logger, [ hero_compiler, adversary_compiler ])
+
+    manifest = BuildManifest()
+    manifest.count(CardBuilder.FAILED, len(invalid))
+    e_code = len(invalid)
+
+    jobs = get_jobs(jobs)
+    if (jobs > 1):
+        e_code += compile_parallel(logger, [ hero_compiler, adversary_compiler ], jobs, skip=invalid, profiles=profiles, force=force, manifest=manifest)
+    else:
+        e_code += compile_heroes(logger, hero_compiler, skip=invalid, profiles=profiles, force=force, manifest=manifest)
+        e_code += compile_adversaries(logger, adversary_compiler, skip=invalid, profiles=profiles, force=force, manifest=manifest)
+
+    manifest.save()
+    logger.info("Build finished: {summary}".format(summary=manifest.get_summary()))
     return 1 if e_code else 0
 
-def compile_heroes(logger):
-    compiler = HeroCompiler()
-    heroes = compiler.search()
+# '--jobs' without the value means a worker per CPU
+def get_jobs(jobs):
+    if (jobs is True):
+        return os.cpu_count() or 1
+    elif (jobs):
+        return max(int(jobs), 1)
+    else:
+        return 1
+
+def compile_parallel(logger, compilers, jobs, skip=(), profiles=None, force=False, manifest=None):
+    cards = [ (compiler.compiler_type, name) for compiler in compilers for name in compiler.search() if not name in skip ]
+    logger.info("Gonna to compile {n} cards with {jobs} workers.".format(n=len(cards), jobs=jobs))
+
+    # Cards of the types with missing fonts are failed before the workers start
+    _no_fonts = { compiler.compiler_type for compiler in compilers if not CardBuilder.check_fonts(compiler.compiler_type) }
+    e_code = sum(1 for compiler_type, _ in cards if compiler_type in _no_fonts)
+    manifest.count(CardBuilder.FAILED, e_code)
+    cards = [ (compiler_type, name) for compiler_type, name in cards if not compiler_type in _no_fonts ]
+    if (not cards):
+        return e_code
+
+    results = BuildPool(jobs, { compiler.compiler_type: type(compiler) for compiler in compilers }).run(cards, manifest, profiles=profiles, force=force)
+    return e_code + sum(1 for status in results.values() if status == CardBuilder.FAILED)
+
+def validate_all(logger, *args):
+    invalid = validate_raw_files(logger, [ HeroCompiler(), AdversaryCompiler() ])
+    if (invalid):
+        return 1
+
+    print("All raw files are valid")
+    return 0
+
+def validate_raw_files(logger, compilers):
+    invalid = { }
+    for compiler in compilers:
+        invalid.update(compiler.validate_all())
+
+    if (invalid):
+        lines = [ "{n} raw files are not valid:".format(n=len(invalid)) ]
+        for filename in sorted(invalid):
+            lines.append("  {filename}:".format(filename=filename))
+            lines.extend("    {error}".format(error=error) for error in invalid[filename])
+        logger.error('\n'.join(lines))
+
+    return invalid
+
+def compile_heroes(logger, compiler=None, skip=(), profiles=None, force=False, manifest=None):
+    if (not compiler):
+        compiler = HeroCompiler()
+    heroes = [ hero for hero in compiler.search() if not hero in skip ]
     e_code = 0
     logger.info("Gonna to compile heroes. There are {n} to deal with.".format(n=len(heroes)))
+    if (heroes and not CardBuilder.check_fonts(compiler.compiler_type)):
+        if (manifest):
+            manifest.count(CardBuilder.FAILED, len(heroes))
+        return len(heroes)
+
     for hero in heroes:
-        e_code += compile_hero(logger, hero, compiler)
+        e_code += compile_hero(logger, hero, compiler, profiles=profiles, force=force, manifest=manifest)
 
     return e_code
 
-def compile_hero(logger, hero, compiler=None):
+def compile_hero(logger, hero, compiler=None, profiles=None, force=False, manifest=None):
     if (not compiler):
         compiler = HeroCompiler()
 
-    result = compiler.open(hero) and compiler.compile() and compiler.save(forced_width=720)
-    if (result):
-        logger.info("Success! File saved to '{filename}'".format(filename=result))
-        return 0
-    else:
-        logger.error("Cannot compile {hero}".format(hero=hero))
-        return 1
+    return compile_card(logger, hero, compiler, profiles=profiles, force=force, manifest=manifest)
 
 
-def compile_adversaries(logger):
-    compiler = AdversaryCompiler()
-    adversaries = compiler.search()
+def compile_adversaries(logger, compiler=None, skip=(), profiles=None, force=False, manifest=None):
+    if (not compiler):
+        compiler = AdversaryCompiler()
+    adversaries = [ adversary for adversary in compiler.search() if not adversary in skip ]
     e_code = 0
     logger.info("Gonna to compile adversaries. There are {n} to deal with.".format(n=len(adversaries)))
+    if (adversaries and not CardBuilder.check_fonts(compiler.compiler_type)):
+        if (manifest):
+            manifest.count(CardBuilder.FAILED, len(adversaries))
+        return len(adversaries)
+
     for adversary in adversaries:
-        e_code += compile_adversary(logger, adversary, compiler)
+        e_code += compile_adversary(logger, adversary, compiler, profiles=profiles, force=force, manifest=manifest)
 
     return e_code
 
-def compile_adversary(logger, adversary, compiler=None):
+def compile_adversary(logger, adversary, compiler=None, profiles=None, force=False, manifest=None):
     if (not compiler):
         compiler = AdversaryCompiler()
 
-    result = compiler.open(adversary) and compiler.compile() and compiler.save(forced_width=1080)
-    if (result):
-        logger.info("Success! File saved to '{filename}'".format(filename=result))
-        return 0
-    else:
-        logger.error("Cannot compile {adversary}".format(adversary=adversary))
+    return compile_card(logger, adversary, compiler, profiles=profiles, force=force, manifest=manifest)
+
+# Compiles the card unless its outputs are up to date in the build manifest (or forced).
+# Without the manifest given, the default one is used and saved.
+def compile_card(logger, name, compiler, profiles=None, force=False, manifest=None):
+    _own_manifest = manifest is None
+    if (_own_manifest):
+        manifest = BuildManifest()
+
+    status, _, _ = CardBuilder.build(compiler, name, compiler.get_output_profiles(profiles), manifest, force=force)
+    if (_own_manifest):
+        manifest.save()
+        logger.info("Build finished: {summary}".format(summary=manifest.get_summary()))
+
+    return 1 if (status == CardBuilder.FAILED) else 0
+
+def preload_fonts(logger, *args):
+    missing = FontPreloader.preload()
+    if (missing):
+        for font_name, bold, italic in missing:
+            print("Missing font: {font}{bold}{italic}".format(font=font_name, bold=", Bold" if bold else '', italic=", Italic" if italic else ''))
         return 1
 
+    print("All fonts are installed")
+    return 0
+
+def clear_cache(logger, *args):
+    count = ScaledImageCache.clear(files=True)
+    print("Scaled images removed: {count} ({directory})".format(count=count, directory=ScaledImageCache.get_directory()))
+    return 0
+
 def run_interactive(logger, *args):
 
     while True:
@@ -133,16 +263,26 @@ def print_help(logger, *kwargs):
 Hammerhal datasheet compiler tool v0.1
 
 Usage:
-  python compile.py COMMAND [ ARGUMENT ]
+  python compile.py COMMAND [ ARGUMENT ] [ OPTIONS ]
 
 Available commands (case-insensitive):
   all           Compiles all heroes and adversaries.
   hero          Compiles a specific hero (argument required).
   adversary     Compiles a specific adversary (argument required).
+  fonts         Preloads all fonts used by the compilers and reports the missing ones.
+  validate      Validates all raw files and reports the invalid ones.
+  clear-cache   Removes the scaled portraits from the cache directory.
   
   interactive   Launches compiler in the interactive mode.
   exit          Exits the interactive mode.
   help, ?       Prints this message.
+
+Options of all, hero and adversary:
+  --profiles=NAME[,NAME...]
+                Output profiles to save (see outputProfiles in compilers.json), 'all' for every profile.
+                Default profiles of the compiler type are saved if not set.
+  --force       Rebuilds the cards even if they are up to date in the build manifest.
+  --jobs=N      Compiles the cards in N worker processes (all only), a worker per CPU if N is not set.
   
 (c) 2017, USSX Hares, MIT License""")
 
@@ -153,11 +293,27 @@ commands = \
     'all': compile_all,
     'hero': compile_hero,
     'adversary': compile_adversary,
+    'fonts': preload_fonts,
+    'validate': validate_all,
+    'clear-cache': clear_cache,
     'interactive': run_interactive,
     'help': print_help,
     '?': print_help
 }
 
+# Option kinds: '--name=value' only, '--name' only, or any of '--name' and '--name=N' with a positive number
+OPTION_VALUE = 'value'
+OPTION_FLAG = 'flag'
+OPTION_COUNT = 'count'
+
+# Options accepted from the command line: { command: { option: kind } }
+command_options = \
+{
+    'all': { 'profiles': OPTION_VALUE, 'force': OPTION_FLAG, 'jobs': OPTION_COUNT },
+    'hero': { 'profiles': OPTION_VALUE, 'force': OPTION_FLAG },
+    'adversary': { 'profiles': OPTION_VALUE, 'force': OPTION_FLAG },
+}
+
 
 if (__name__ == "__main__"):
     e_code = start()
@@ -23,6 +23,7 @@ setup \
         'jsonschema',
         'Pillow',
         'fontTools',
+        'numpy',
         'camel-case-switcher>=1.2',
         'yn-input',
     ],
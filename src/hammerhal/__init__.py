@@ -1,2 +1,3 @@
 from hammerhal.config_loader import ConfigLoader
 from hammerhal.color_parser import __get_color as get_color
+from hammerhal.cache_directory import get_cache_directory
@@ -0,0 +1,11 @@
+import os
+
+
+# Returns the user cache directory of hammerhal, where the persistent indexes and caches are stored
+def get_cache_directory():
+    if (os.name == 'nt'):
+        _base = os.environ.get('LOCALAPPDATA', None) or os.path.expanduser('~')
+    else:
+        _base = os.environ.get('XDG_CACHE_HOME', None) or os.path.join(os.path.expanduser('~'), '.cache')
+
+    return os.path.join(_base, 'hammerhal')
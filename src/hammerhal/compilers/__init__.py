@@ -1,6 +1,18 @@
 from hammerhal.compilers.compiler_base import CompilerBase
 from hammerhal.compilers.compiler_error import CompilerError
+from hammerhal.compilers.module_config import ModuleConfig, FontSpec
+from hammerhal.compilers.raw_index import RawIndex
+from hammerhal.compilers.template_cache import TemplateCache
+from hammerhal.compilers.asset_cache import AssetCache, Asset
+from hammerhal.compilers.scaled_image_cache import ScaledImageCache
+from hammerhal.compilers.image_exporter import ImageExporter, OutputProfile
 from hammerhal.compilers.compiler_module_base import CompilerModuleBase
+from hammerhal.compilers.font_preloader import FontPreloader
+from hammerhal.compilers.file_hash_cache import FileHashCache
+from hammerhal.compilers.build_manifest import BuildManifest
+from hammerhal.compilers.card_builder import CardBuilder
+from hammerhal.compilers.build_pool import BuildPool
+from hammerhal.compilers.batch_compiler import BatchCompiler, BatchResult
 
 from hammerhal.compilers.hero_compiler import HeroCompiler
 from hammerhal.compilers.adversary_compiler import AdversaryCompiler
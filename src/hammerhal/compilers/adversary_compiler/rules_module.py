@@ -20,40 +20,52 @@ class AdversaryRulesModule(CompilerModuleBase):
     def _compile(self, base):
         td = self.get_text_drawer(base)
 
-        y_min = 0
-        y_max = self.height
+        abilities = [ ("**{name}:** {description}".format(**ability), ability.get('right', False)) for ability in self.parent.raw['abilities'] ]
+        difficulty_bonuses = [ ("**Difficulty Bonus {name}:** {description}".format(**ability), ability.get('right', False)) for ability in self.parent.raw.get('difficultyBonuses', []) ]
 
-        y = y_min
-        column_number = 0
-        for ability in self.parent.raw['abilities']:
-            text = "**{name}:** {description}".format(**ability)
-            if (ability.get('right', False)):
-                y = y_min
-                column_number += 1
-            y, column_number = self.__print_rules_block(text_drawer=td, y=y, y_min=y_min, y_max=y_max, column_number=column_number, text=text)
+        if (self.get_from_module_config('fitToRegion')):
+            _font_size = td.fit_font_size(lambda: self.__fits(td, abilities + difficulty_bonuses), min_font_size=self.get_from_module_config('minFontSize'))
+            self.logger.debug("Rules font size: {size}".format(size=_font_size))
+
+        y, column_number = self.__print_rules(td, abilities, real_print=True)
 
         try:
-            for ability in self.parent.raw.get('difficultyBonuses', []):
-                text = "**Difficulty Bonus {name}:** {description}".format(**ability)
-                if (ability.get('right', False)):
-                    y = y_min
-                    column_number += 1
-                y, column_number = self.__print_rules_block(text_drawer=td, y=y, y_min=y_min, y_max=y_max, column_number=column_number, text=text)
+            self.__print_rules(td, difficulty_bonuses, real_print=True, y=y, column_number=column_number)
         except AdversaryRulesModule.OutOfSpaceException as e:
             self.logger.warning("No space left on sheet for the difficulty bonus, it will be ignored")
         else:
             self.logger.info("Rules printed")
 
+    def __fits(self, text_drawer, blocks):
+        try:
+            self.__print_rules(text_drawer, blocks, real_print=False)
+        except AdversaryRulesModule.OutOfSpaceException:
+            return False
+        else:
+            return True
+
+    def __print_rules(self, text_drawer, blocks, real_print:bool, y:int=0, column_number:int=0):
+        y_min = 0
+        y_max = self.height
+
+        for text, right in blocks:
+            if (right):
+                y = y_min
+                column_number += 1
+            y, column_number = self.__print_rules_block(text_drawer=text_drawer, y=y, y_min=y_min, y_max=y_max, column_number=column_number, text=text, real_print=real_print)
+
+        return y, column_number
 
     class OutOfSpaceException(CompilerError):
         pass
 
-    def __print_rules_block(self, text_drawer, column_number, y:int, y_min :int, y_max :int, text :str):
+    def __print_rules_block(self, text_drawer, column_number, y:int, y_min :int, y_max :int, text :str, real_print:bool=True):
         x1 = self.get_from_module_config("textLeft");
         x2 = x1 + self.get_from_module_config("columnsWidth")
         dy = self.parent.raw.get('rulesSeparatorHeight', self.get_from_module_config("defaultRulesSeparatorHeight"))
 
-        _, _h = text_drawer.get_text_size((x1, y, x2, 0), text, offset_borders=False)
+        layout = text_drawer.get_text_layout((x1, y, x2, 0), text, offset_borders=False)
+        _h = layout.height
         _h += dy
 
         if (y + _h > y_max):
@@ -62,14 +74,16 @@ class AdversaryRulesModule(CompilerModuleBase):
 
         if (column_number >= self.get_from_module_config("columnsCount")):
             message = "Not enough space left on the sheet to print the rule: {text}".format(text=text)
-            self.logger.error(message)
+            if (real_print):
+                self.logger.error(message)
             raise AdversaryRulesModule.OutOfSpaceException(message)
 
-        _dx = (self.get_from_module_config("columnsWidth") + self.get_from_module_config("columnsSeparatorWidth")) * column_number
-        x1 += _dx; x2 += _dx
+        if (real_print):
+            _dx = (self.get_from_module_config("columnsWidth") + self.get_from_module_config("columnsSeparatorWidth")) * column_number
+            x1 += _dx; x2 += _dx
 
-        # -5 because of not correct intuitive of text while on print
-        text_drawer.print_in_region((x1, y - 5, x2, y - 5 + _h), text, offset_borders=False)
+            # -5 because of not correct intuitive of text while on print
+            text_drawer.print_layout(layout, (x1, y - 5, x2, y - 5 + _h), offset_borders=False)
 
         y += _h
         return y, column_number
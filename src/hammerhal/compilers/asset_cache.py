@@ -0,0 +1,56 @@
+import os
+from PIL import Image
+from hammerhal.lru_cache import LruCache
+from logging import getLogger
+logger = getLogger('hammerhal.compilers.asset_cache')
+
+
+# Decoded compiler image, ready to be pasted: color planes without alpha and the alpha plane as the mask.
+# Images without alpha are pasted with themselves as the mask, as before.
+class Asset:
+    __slots__ = ('image', 'color', 'mask')
+
+    def __init__(self, image:Image.Image):
+        self.image = image
+        if (image.mode.endswith('A')):
+            self.color = image.convert(image.mode[:-1])
+            self.mask = image.getchannel('A')
+        else:
+            self.color = image
+            self.mask = image
+
+    @property
+    def size(self):
+        return self.image.size
+
+    @property
+    def bytes(self):
+        return sum(_image.width * _image.height * len(_image.getbands()) for _image in { id(_image): _image for _image in (self.image, self.color, self.mask) }.values())
+
+# Process-wide cache of the decoded compiler images (dice, icons and other images of the sources directory), keyed by the file path.
+# Assets are shared by all the callers and must not be modified.
+# Modified files are decoded again; least recently used assets are evicted when the cache grows over 64 MB. Thread-safe.
+class AssetCache:
+
+    # { path: (mtime, Asset) }
+    __assets = LruCache('Asset', max_bytes=64 * 1024 * 1024, get_bytes=lambda cached: cached[1].bytes)
+
+    @staticmethod
+    def get_asset(path:str) -> Asset:
+        _mtime = os.stat(path).st_mtime_ns
+        return AssetCache.__assets.get(path, lambda: (_mtime, AssetCache.__decode(path)), is_valid=lambda cached: cached[0] == _mtime)[1]
+
+    @staticmethod
+    def __decode(path:str):
+        logger.debug("Decoding asset {path}".format(path=path))
+        with Image.open(path) as file:
+            return Asset(file.copy())
+
+    @staticmethod
+    def get_stats():
+        return AssetCache.__assets.get_stats()
+
+    @staticmethod
+    def clear():
+        logger.debug("Clearing asset cache: {stats}".format(stats=AssetCache.get_stats()))
+        AssetCache.__assets.clear()
@@ -0,0 +1,83 @@
+from hammerhal.compilers.compiler_base import CompilerBase
+from hammerhal.compilers.card_builder import CardBuilder
+from hammerhal.compilers.font_preloader import FontPreloader
+from logging import getLogger
+logger = getLogger('hammerhal.compilers.batch_compiler')
+
+
+# Result of a card compiled in memory.
+# outputs: { profile name: PIL image, or bytes in the format of the profile if encoded }, empty if the card failed;
+# image: the compiled image in full resolution; errors: validation or compilation error messages.
+class BatchResult:
+    __slots__ = ('index', 'name', 'status', 'image', 'outputs', 'errors')
+
+    COMPILED = 'compiled'
+    FAILED = CardBuilder.FAILED
+
+    def __init__(self, index:int, name:str, status:str, image=None, outputs:dict=None, errors:list=None):
+        self.index = index
+        self.name = name
+        self.status = status
+        self.image = image
+        self.outputs = outputs or { }
+        self.errors = errors or [ ]
+
+    @property
+    def ok(self):
+        return self.status == BatchResult.COMPILED
+
+    def __repr__(self):
+        return "BatchResult(#{index} {name}: {status}, outputs={outputs})".format(index=self.index, name=self.name, status=self.status, outputs=', '.join(self.outputs))
+
+# Library API: compiles raw cards given as dicts and yields the results in memory, no raw or output files are involved.
+# One compiler is used for the whole iterable, so the schema validator, module configs, fonts and caches are reused by all the cards.
+# Every card is compiled in isolation: its errors are reported in its result, the following cards are compiled anyway.
+# Not thread-safe: use a BatchCompiler per thread (or a BuildPool for the files).
+class BatchCompiler:
+
+    compiler = None
+    profiles = None
+    encode = False
+
+    # compiler: CompilerBase instance or class; profiles: output profile names (see CompilerBase.get_output_profiles());
+    # encode: if set, the outputs are encoded by the exporters of the profiles, PIL images otherwise
+    def __init__(self, compiler, profiles=None, encode:bool=False):
+        self.compiler = compiler() if (isinstance(compiler, type)) else compiler
+        self.profiles = self.compiler.get_output_profiles(profiles)
+        self.encode = encode
+
+        # Fonts are resolved in the background while the first raw is validated
+        FontPreloader.start()
+
+    # Yields BatchResult for each of the raw dicts, in the same order
+    def compile(self, raws):
+        # Missing fonts are reported once, before the first card
+        CardBuilder.check_fonts(self.compiler.compiler_type)
+        for index, raw in enumerate(raws):
+            yield self.compile_raw(raw, index)
+
+    def compile_raw(self, raw:dict, index:int=0) -> BatchResult:
+        name = raw.get('name', None) if (isinstance(raw, dict)) else None
+        errors = self.compiler.load(raw)
+        if (errors):
+            for error in errors:
+                logger.error("Raw #{index} is not valid: {msg}".format(index=index, msg=error))
+            return BatchResult(index, name, BatchResult.FAILED, errors=errors)
+
+        if (not CardBuilder.check_fonts(self.compiler.compiler_type)):
+            return BatchResult(index, name, BatchResult.FAILED, errors=[ "Fonts are missing: {fonts}".format(fonts=', '.join(font_name for font_name, _, _ in FontPreloader.wait(self.compiler.compiler_type))) ])
+
+        try:
+            image = self.compiler.compile()
+            if (not image):
+                return BatchResult(index, name, BatchResult.FAILED, errors=[ "Cannot compile {name}".format(name=name) ])
+
+            outputs = { }
+            for profile, variant in zip(self.profiles, self.compiler.get_variants(self.profiles)):
+                outputs[profile.name] = profile.exporter.encode(variant) if (self.encode) else variant
+        except Exception as e:
+            logger.exception("Error while compiling {name}".format(name=name))
+            return BatchResult(index, name, BatchResult.FAILED, errors=[ "{type}: {e}".format(type=type(e).__name__, e=e) ])
+
+        logger.info("Compiled {name} in memory: {profiles}".format(name=name, profiles=', '.join(outputs)))
+        return BatchResult(index, name, BatchResult.COMPILED, image, outputs)
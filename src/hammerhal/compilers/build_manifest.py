@@ -0,0 +1,110 @@
+import os, json, hashlib
+from hammerhal.config_loader import ConfigLoader
+from hammerhal.compilers.file_hash_cache import FileHashCache
+from logging import getLogger
+logger = getLogger('hammerhal.compilers.build_manifest')
+
+
+# Manifest of the built cards: the input hash of every output file (see CompilerBase.get_input_hash()).
+# Outputs which exist and were built from the same inputs are up to date and are not rebuilt.
+# Stored as JSON in the output directory root.
+class BuildManifest:
+
+    VERSION = 1
+    FILENAME = 'build_manifest.json'
+
+    __tool_hash = None
+
+    path = None
+    outputs = None
+    __modified = False
+
+    rebuilt = 0
+    skipped = 0
+    failed = 0
+
+    # With the outputs given, the manifest is an in-memory copy (i.e. in the worker processes), which is neither loaded nor saved
+    def __init__(self, path:str=None, outputs:dict=None):
+        if (outputs is not None):
+            self.outputs = dict(outputs)
+            return
+
+        self.path = path or BuildManifest.get_default_path()
+        self.outputs = {}
+        self.__load()
+
+    @staticmethod
+    def get_default_path():
+        return "{directory}{name}".format(directory=ConfigLoader.get_from_config('outputDirectoryRoot', 'compilers'), name=BuildManifest.FILENAME)
+
+    def __load(self):
+        if (not self.path or not os.path.isfile(self.path)):
+            return
+
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            logger.warning("Build manifest is corrupted, all cards will be rebuilt: {path}".format(path=self.path), exc_info=True)
+            return
+
+        if (data.get('version', None) != BuildManifest.VERSION):
+            logger.info("Build manifest format changed, all cards will be rebuilt")
+            return
+
+        self.outputs = data.get('outputs', {})
+        logger.debug("Build manifest loaded: {n} outputs".format(n=len(self.outputs)))
+
+    def save(self):
+        if (not self.path or not self.__modified):
+            return
+
+        data = \
+        {
+            'version': BuildManifest.VERSION,
+            'outputs': self.outputs,
+        }
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            _tmp_path = self.path + '.tmp'
+            with open(_tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file, indent=4, sort_keys=True)
+            os.replace(_tmp_path, self.path)
+        except OSError:
+            logger.warning("Cannot save build manifest: {path}".format(path=self.path), exc_info=True)
+        else:
+            self.__modified = False
+            logger.debug("Build manifest saved: {path}".format(path=self.path))
+
+    def is_up_to_date(self, filenames, input_hash:str):
+        return all(self.outputs.get(_filename, None) == input_hash and os.path.isfile(_filename) for _filename in filenames)
+
+    def update(self, filenames, input_hash:str):
+        for _filename in filenames:
+            self.outputs[_filename] = input_hash
+        self.__modified = True
+
+    # Counts the card build status: 'rebuilt', 'skipped' or 'failed'
+    def count(self, status:str, n:int=1):
+        setattr(self, status, getattr(self, status) + n)
+
+    def get_summary(self):
+        return "{rebuilt} rebuilt, {skipped} skipped (up to date), {failed} failed".format(rebuilt=self.rebuilt, skipped=self.skipped, failed=self.failed)
+
+    # Hash of the hammerhal package sources, so the cards are rebuilt when the tool changes
+    @staticmethod
+    def get_tool_hash():
+        if (BuildManifest.__tool_hash is None):
+            _root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            _hash = hashlib.sha1()
+            for _directory, _, _files in sorted(os.walk(_root)):
+                for _file in sorted(_files):
+                    if (_file.endswith('.py')):
+                        _path = os.path.join(_directory, _file)
+                        _hash.update(os.path.relpath(_path, _root).encode('utf-8'))
+                        _hash.update((FileHashCache.get_hash(_path) or '').encode('utf-8'))
+
+            BuildManifest.__tool_hash = _hash.hexdigest()
+
+        return BuildManifest.__tool_hash
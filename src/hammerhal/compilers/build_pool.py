@@ -0,0 +1,149 @@
+import time
+import logging, logging.handlers
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from hammerhal.config_loader import ConfigLoader
+from hammerhal.compilers.compiler_base import CompilerBase
+from hammerhal.compilers.build_manifest import BuildManifest
+from hammerhal.compilers.card_builder import CardBuilder
+from hammerhal.compilers.font_preloader import FontPreloader
+logger = logging.getLogger('hammerhal.compilers.build_pool')
+
+
+# Builds the cards in a pool of worker processes.
+# Workers are warmed once (configs, compilers, fonts), every card is built in isolation: its errors are reported as its failure,
+# and the cards lost with a crashed worker are retried, each in a separate process. Log records of the workers are sent to this process through a queue.
+class BuildPool:
+
+    # Worker process state
+    __compilers = None
+    __manifest = None
+    __profiles = None
+    __force = False
+
+    jobs = None
+    compiler_types = None
+    __elapsed = 0.0
+
+    # compiler_types: { compiler type: compiler class }
+    def __init__(self, jobs:int, compiler_types:dict):
+        self.jobs = jobs
+        self.compiler_types = compiler_types
+
+    # Builds the cards: list of (compiler type, raw filename). Counts the statuses and records the outputs to the manifest.
+    # Returns { (compiler type, raw filename): status }
+    def run(self, cards, manifest:BuildManifest, profiles=None, force=False) -> dict:
+        results = { }
+        self.__elapsed = 0.0
+        _start = time.perf_counter()
+
+        def _on_result(card, result):
+            status, filenames, input_hash, card_time = result
+            results[card] = status
+            self.__elapsed += card_time
+            manifest.count(status)
+            if (status == CardBuilder.REBUILT):
+                manifest.update(filenames, input_hash)
+
+        # Managed queue: a worker crashing in the middle of put() cannot leave it locked for the others
+        _manager = multiprocessing.Manager()
+        log_queue = _manager.Queue()
+        listener = logging.handlers.QueueListener(log_queue, BuildPool.__LogDispatcher())
+        listener.start()
+        try:
+            _initargs = (log_queue, logging.getLogger('hammerhal').getEffectiveLevel(), self.compiler_types, manifest.outputs, profiles, force)
+            lost = [ ]
+            with ProcessPoolExecutor(max_workers=self.jobs, initializer=BuildPool.initialize_worker, initargs=_initargs) as executor:
+                futures = { executor.submit(BuildPool.build_card, compiler_type, name): (compiler_type, name) for compiler_type, name in cards }
+                for future in as_completed(futures):
+                    try:
+                        _on_result(futures[future], future.result())
+                    except BrokenProcessPool:
+                        lost.append(futures[future])
+
+            if (lost):
+                # The crashed card is unknown, so each of the lost cards is retried in a separate process
+                logger.warning("Worker process crashed, retrying {n} cards in separate processes".format(n=len(lost)))
+                with ThreadPoolExecutor(max_workers=self.jobs) as threads:
+                    for card, result in zip(lost, threads.map(lambda card: BuildPool.__run_isolated(card, _initargs), lost)):
+                        _on_result(card, result)
+        finally:
+            listener.stop()
+            _manager.shutdown()
+
+        _wall_time = time.perf_counter() - _start
+        logger.info("Throughput: {n} cards in {wall:.1f}s with {jobs} workers, {rate:.2f} cards/s, {avg:.2f}s per card, {busy:.1f} workers busy on average".format \
+        (
+            n = len(results),
+            wall = _wall_time,
+            jobs = self.jobs,
+            rate = len(results) / _wall_time if _wall_time else 0.0,
+            avg = self.__elapsed / len(results) if results else 0.0,
+            busy = self.__elapsed / _wall_time if _wall_time else 0.0,
+        ))
+
+        return results
+
+    @staticmethod
+    def __run_isolated(card, initargs):
+        compiler_type, name = card
+        try:
+            with ProcessPoolExecutor(max_workers=1, initializer=BuildPool.initialize_worker, initargs=initargs) as executor:
+                return executor.submit(BuildPool.build_card, compiler_type, name).result()
+        except BrokenProcessPool:
+            logger.error("Cannot compile {name}: worker process crashed".format(name=name))
+            return CardBuilder.FAILED, [ ], None, 0.0
+
+    # Passes the records received from the workers to the loggers of this process, so they are handled by its logging config
+    class __LogDispatcher(logging.Handler):
+        def handle(self, record):
+            _logger = logging.getLogger(record.name)
+            if (_logger.isEnabledFor(record.levelno)):
+                _logger.handle(record)
+
+            return True
+
+        def emit(self, record):
+            pass
+
+    # Public, so it could be sent to the worker processes
+    @staticmethod
+    def initialize_worker(log_queue, log_level, compiler_types, manifest_outputs, profiles, force):
+        # Inherited handlers (files, console) are replaced by the queue
+        _root = logging.getLogger()
+        for _handler in list(_root.handlers):
+            _root.removeHandler(_handler)
+        _root.addHandler(logging.handlers.QueueHandler(log_queue))
+        _logger = logging.getLogger('hammerhal')
+        for _handler in list(_logger.handlers):
+            _logger.removeHandler(_handler)
+        _logger.setLevel(log_level)
+        _logger.propagate = True
+
+        ConfigLoader.load_configs()
+        # Cards are given by the raw file paths, and nobody could answer the prompts anyway
+        CompilerBase.interactive = False
+        BuildPool.__compilers = { compiler_type: compiler_class() for compiler_type, compiler_class in compiler_types.items() }
+        BuildPool.__manifest = BuildManifest(outputs=manifest_outputs)
+        BuildPool.__force = force
+        BuildPool.__profiles = { compiler_type: compiler.get_output_profiles(profiles) for compiler_type, compiler in BuildPool.__compilers.items() }
+
+        # Fonts are loaded up front; templates are decoded once per worker on the first use (see TemplateCache),
+        # decoding all of them eagerly would cost every worker hundreds of megabytes
+        FontPreloader.start()
+        FontPreloader.wait()
+
+    # Public, so it could be sent to the worker processes. Returns (status, output filenames, input hash, build time)
+    @staticmethod
+    def build_card(compiler_type:str, name:str):
+        _start = time.perf_counter()
+        try:
+            compiler = BuildPool.__compilers[compiler_type]
+            status, filenames, input_hash = CardBuilder.build(compiler, name, BuildPool.__profiles[compiler_type], BuildPool.__manifest, force=BuildPool.__force)
+        except Exception:
+            logger.exception("Error while compiling {name}".format(name=name))
+            status, filenames, input_hash = CardBuilder.FAILED, [ ], None
+
+        return status, filenames, input_hash, time.perf_counter() - _start
@@ -0,0 +1,55 @@
+from hammerhal.compilers.font_preloader import FontPreloader
+from logging import getLogger
+logger = getLogger('hammerhal.compilers.card_builder')
+
+
+# Builds a single card: opens the raw, skips it if the outputs are up to date in the build manifest,
+# otherwise compiles and saves it in the output profiles and records the outputs to the manifest.
+class CardBuilder:
+
+    REBUILT = 'rebuilt'
+    SKIPPED = 'skipped'
+    FAILED = 'failed'
+
+    # Compiler types which missing fonts are already reported
+    __reported_types = set()
+
+    # Returns (status, output filenames, input hash)
+    @staticmethod
+    def build(compiler, name, profiles, manifest, force=False):
+        if (not (compiler.open(name) and CardBuilder.check_fonts(compiler.compiler_type))):
+            logger.error("Cannot compile {name}".format(name=name))
+            return CardBuilder.__finish(manifest, CardBuilder.FAILED, [ ], None)
+
+        input_hash = compiler.get_input_hash()
+        filenames = compiler.get_output_filenames(profiles)
+        if (not force and manifest.is_up_to_date(filenames, input_hash)):
+            logger.info("Up to date, skipped: {filenames}".format(filenames=', '.join("'{0}'".format(_filename) for _filename in filenames)))
+            return CardBuilder.__finish(manifest, CardBuilder.SKIPPED, filenames, input_hash)
+
+        result = compiler.compile() and compiler.save(profiles=profiles)
+        if (result):
+            logger.info("Success! Files saved to {filenames}".format(filenames=', '.join("'{0}'".format(_filename) for _filename in result)))
+            manifest.update(result, input_hash)
+            return CardBuilder.__finish(manifest, CardBuilder.REBUILT, result, input_hash)
+        else:
+            logger.error("Cannot compile {name}".format(name=name))
+            return CardBuilder.__finish(manifest, CardBuilder.FAILED, [ ], None)
+
+    @staticmethod
+    def __finish(manifest, status, filenames, input_hash):
+        manifest.count(status)
+        return status, filenames, input_hash
+
+    # Waits for the font preload, if it was started. Returns False if any of the fonts of the compiler type is missing.
+    # Missing fonts are reported once per compiler type, so the batches check them before the first card.
+    @staticmethod
+    def check_fonts(compiler_type:str):
+        missing = FontPreloader.wait(compiler_type)
+        if (missing):
+            if (not compiler_type in CardBuilder.__reported_types):
+                CardBuilder.__reported_types.add(compiler_type)
+                logger.error("Fonts of the {type} cards are missing: {fonts}".format(type=compiler_type, fonts=', '.join(font_name for font_name, _, _ in missing)))
+            return False
+
+        return True
@@ -1,10 +1,22 @@
-import json, os.path, glob
-import jsonschema.exceptions
-from jsonschema import validate
+import json, os.path, glob, hashlib
+import jsonschema.validators
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from PIL import Image
 
 from yn_input import yn_input
 from hammerhal import ConfigLoader
+from hammerhal.compilers.module_config import ModuleConfig
+from hammerhal.compilers.raw_index import RawIndex
+from hammerhal.compilers.template_cache import TemplateCache
+from hammerhal.compilers.asset_cache import AssetCache
+from hammerhal.compilers.scaled_image_cache import ScaledImageCache
+from hammerhal.compilers.image_exporter import ImageExporter, OutputProfile
+from hammerhal.compilers.compiler_error import CompilerError
+from hammerhal.compilers.file_hash_cache import FileHashCache
+from hammerhal.compilers.build_manifest import BuildManifest
+from hammerhal.compilers.font_preloader import FontPreloader
+from hammerhal.cache_directory import get_cache_directory
 from logging import getLogger
 logger = getLogger('hammerhal.compilers.compiler_base')
 
@@ -22,6 +34,25 @@ class CompilerBase():
     raw = None
     compiled = None
     compiled_modules = None
+    exporter = None
+    output_profiles = None
+
+    # Batches with at least this many raw files are validated in parallel processes
+    parallel_validation_threshold = 16
+
+    # { schema path: validator }, schemas are read and checked once per process
+    __validators = {}
+    # { raw file path: mtime } of the files which passed the batch validation
+    __validated = {}
+
+    # If not set, find() asks to confirm the matches by the name
+    interactive = True
+    # Directory of the persistent raw indexes. If not set, the user cache directory is used
+    index_directory = None
+    # { (compiler type, absolute raw directory): RawIndex }
+    __raw_indexes = {}
+    # { compiler type: (config generation, hash) }
+    __config_hashes = {}
 
     def __init__(self):
         self.schema_path = "{directory}{type}.json".format(directory=ConfigLoader.get_from_config('schemasDirectory', 'compilers'), type=self.compiler_type)
@@ -29,6 +60,11 @@ class CompilerBase():
         self.output_directory = "{rawRoot}{rawOffset}".format(rawRoot=ConfigLoader.get_from_config('outputDirectoryRoot', 'compilers'), rawOffset=ConfigLoader.get_from_config('compilerTypeSpecific/{type}/outputDirectory'.format(type=self.compiler_type), 'compilers'))
         self.sources_directory = ConfigLoader.get_from_config('sourcesDirectory', 'compilers')
 
+        # Typos in the module configs are reported before anything is compiled
+        ModuleConfig.compile_all(self.compiler_type)
+        self.exporter = ImageExporter.from_config(self.compiler_type)
+        self.output_profiles = OutputProfile.from_config(self.compiler_type)
+
         if (self.modules):
             self.compiled_modules = [] * len(self.modules)
             for _iter in self.modules:
@@ -45,7 +81,10 @@ class CompilerBase():
     def search(self):
         return glob.glob(self.raw_directory + "*.json")
 
-    def find(self, name):
+    # Returns the raw file path by the file path, the file name or the name (or subtitle) of the raw.
+    # Names are looked up in the raw index. In the interactive mode each candidate is confirmed by the user, the best first,
+    # otherwise the best match is returned directly.
+    def find(self, name, interactive=None):
         filename = name
         if (os.path.isfile(filename)):
             return filename
@@ -54,30 +93,47 @@ class CompilerBase():
         if (os.path.isfile(filename)):
             return filename
 
-        for filename in self.search():
-            try:
-                _file = open(filename)
-                _json = json.load(_file)
-                _file.close()
+        if (interactive is None):
+            interactive = CompilerBase.interactive
 
-                _name = _json.get('name', None)
-                if (_name and isinstance(_name, str) and name.lower() in _name.lower()):
-                    message = "{type} found - {filename}:\n  {name}{subtitle}".format \
-                    (
-                        type = self.compiler_type.capitalize(),
-                        filename = filename,
-                        name = _name,
-                        subtitle = " ({subtitle})".format(**_json) if (_json.get('subtitle', None)) else '',
-                    )
-                    print(message)
-                    if (yn_input('Is it what you need?')):
-                        return filename
-
-            except (OSError, FileNotFoundError, json.JSONDecodeError):
-                pass
+        candidates = self.get_raw_index().search(name)
+        if (not candidates):
+            return None
+
+        if (not interactive):
+            _kind, filename, _name, _subtitle = candidates[0]
+            _others = [ _filename for _kind2, _filename, _, _ in candidates[1:] if _kind2 == _kind ]
+            if (_others):
+                logger.warning("{type} '{query}' is ambiguous, using {filename}; other matches: {others}".format(type=self.compiler_type.capitalize(), query=name, filename=filename, others=', '.join(_others)))
+            return filename
+
+        for _kind, filename, _name, _subtitle in candidates:
+            message = "{type} found - {filename}:\n  {name}{subtitle}".format \
+            (
+                type = self.compiler_type.capitalize(),
+                filename = filename,
+                name = _name,
+                subtitle = " ({subtitle})".format(subtitle=_subtitle) if (_subtitle) else '',
+            )
+            print(message)
+            if (yn_input('Is it what you need?')):
+                return filename
 
         return None
 
+    # Returns the raw index of the raw directory, brought up to date with it.
+    # Every raw directory (i.e. of another checkout) has its own index file, named by the hash of its absolute path.
+    def get_raw_index(self) -> RawIndex:
+        _directory = os.path.abspath(self.raw_directory)
+        index = CompilerBase.__raw_indexes.get((self.compiler_type, _directory), None)
+        if (index is None):
+            _filename = 'raw_index_{type}_{hash}.json'.format(type=self.compiler_type, hash=hashlib.sha1(_directory.encode('utf-8')).hexdigest()[:16])
+            index = RawIndex(os.path.join(CompilerBase.index_directory or get_cache_directory(), _filename))
+            CompilerBase.__raw_indexes[(self.compiler_type, _directory)] = index
+
+        index.refresh(self.search())
+        return index
+
     def open(self, name):
         filename = self.find(name)
         if (not filename):
@@ -88,31 +144,142 @@ class CompilerBase():
         raw = json.load(file)
         file.close()
 
-        filename = self.schema_path
-        logger.debug("Reading '{filename}'...".format(filename=filename))
-        file = open(filename)
-        schema = json.load(file)
-        file.close()
+        if (CompilerBase.__is_validated(filename)):
+            logger.debug("Raw file is already validated")
+            self.raw = raw
+            return self.raw
 
-        try:
-            logger.debug("Validating {name}...".format(name=name))
-            validate(raw, schema)
-        except jsonschema.exceptions.ValidationError as e:
-            logger.error("Raw file is not valid: {msg}".format(msg=e.message))
-            self.raw = None
+        logger.debug("Validating {name}...".format(name=name))
+        errors = self.load(raw)
+        if (errors):
+            for error in errors:
+                logger.error("Raw file is not valid: {msg}".format(msg=error))
         else:
             logger.debug("Raw file is valid")
-            self.raw = raw
 
         return self.raw
 
-    def prepare_base(self):
-        name_template = ConfigLoader.get_from_config('compilerTypeSpecific/{type}/baseNameTemplate'.format(type=self.compiler_type), 'compilers')
-        name = name_template
+    # Opens the raw card given as a dict, without any files. Returns the list of validation errors, empty if the raw is opened.
+    def load(self, raw:dict) -> list:
+        errors = CompilerBase.__get_errors(self.get_validator(), raw)
+        self.raw = None if (errors) else raw
+        return errors
+
+    def get_validator(self):
+        return CompilerBase.get_schema_validator(self.schema_path)
+
+    @staticmethod
+    def get_schema_validator(schema_path:str):
+        validator = CompilerBase.__validators.get(schema_path, None)
+        if (validator is None):
+            logger.debug("Compiling schema '{filename}'...".format(filename=schema_path))
+            with open(schema_path) as file:
+                schema = json.load(file)
+
+            _validator_type = jsonschema.validators.validator_for(schema)
+            _validator_type.check_schema(schema)
+            validator = _validator_type(schema)
+            CompilerBase.__validators[schema_path] = validator
+
+        return validator
+
+    # Validates raw files (all found by search() by default), in parallel if there are many of them.
+    # Returns { filename: [ error messages ] } of the invalid files, the valid ones are not validated again by open().
+    def validate_all(self, filenames=None) -> dict:
+        if (filenames is None):
+            filenames = self.search()
+
+        if (len(filenames) >= CompilerBase.parallel_validation_threshold):
+            with ProcessPoolExecutor() as executor:
+                results = list(executor.map(CompilerBase.validate_file, repeat(self.schema_path), filenames, chunksize=8))
+        else:
+            results = [ CompilerBase.validate_file(self.schema_path, filename) for filename in filenames ]
+
+        invalid = { }
+        for filename, errors in zip(filenames, results):
+            if (errors):
+                invalid[filename] = errors
+            else:
+                CompilerBase.__validated[filename] = os.path.getmtime(filename)
+
+        logger.debug("{type} raw files validated: {n} total, {invalid} invalid".format(type=self.compiler_type.capitalize(), n=len(filenames), invalid=len(invalid)))
+        return invalid
+
+    # Public, so it could be sent to the worker processes
+    @staticmethod
+    def validate_file(schema_path:str, filename:str):
+        try:
+            with open(filename) as file:
+                raw = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            return [ "Cannot read file: {e}".format(e=e) ]
+
+        return CompilerBase.__get_errors(CompilerBase.get_schema_validator(schema_path), raw)
+
+    @staticmethod
+    def __get_errors(validator, raw):
+        errors = sorted(validator.iter_errors(raw), key=lambda e: [ str(_key) for _key in e.absolute_path ])
+        return [ "{path}: {msg}".format(path='/'.join(str(_key) for _key in error.absolute_path) or '(root)', msg=error.message) for error in errors ]
+
+    @staticmethod
+    def __is_validated(filename:str):
+        _mtime = CompilerBase.__validated.get(filename, None)
+        return _mtime is not None and _mtime == os.path.getmtime(filename)
+
+    def get_base_path(self):
+        name = ConfigLoader.get_from_config('compilerTypeSpecific/{type}/baseNameTemplate'.format(type=self.compiler_type), 'compilers')
         if ("{weaponsCount}" in name):
             name = name.replace('{weaponsCount}', str(len(self.raw['weapons'])))
 
-        filepath = "{directory}{name}".format(directory=self.sources_directory, name=name)
+        return "{directory}{name}".format(directory=self.sources_directory, name=name)
+
+    # Hash of everything the opened card is built from: the raw, its image, the card template,
+    # the compiler type config with the fonts and images it refers to, and the tool sources.
+    def get_input_hash(self):
+        _hash = hashlib.sha1()
+        _hash.update(BuildManifest.get_tool_hash().encode('utf-8'))
+        _hash.update(self.__get_config_hash().encode('utf-8'))
+        _hash.update(json.dumps(self.raw, sort_keys=True).encode('utf-8'))
+
+        _files = [ self.get_base_path() ]
+        if (self.raw.get('image', None)):
+            _files.append("{directory}{name}".format(directory=ConfigLoader.get_from_config('rawDirectoryRoot'), name=self.raw['image']))
+        for _path in _files:
+            _hash.update("{path}:{hash}".format(path=_path, hash=FileHashCache.get_hash(_path)).encode('utf-8'))
+
+        return _hash.hexdigest()
+
+    # Hash of the compiler type config, computed once per config generation
+    def __get_config_hash(self):
+        cached = CompilerBase.__config_hashes.get(self.compiler_type, None)
+        if (cached and cached[0] == ConfigLoader.generation):
+            return cached[1]
+
+        section = ConfigLoader.get_from_config('compilerTypeSpecific/{type}'.format(type=self.compiler_type), 'compilers')
+        _main = { key: ConfigLoader.get_from_config(key) for key in ('textRenderMode', 'textMetricsBackend') }
+
+        _hash = hashlib.sha1()
+        _hash.update(json.dumps([ section, _main ], sort_keys=True).encode('utf-8'))
+
+        _files = FontPreloader.get_font_files(FontPreloader.collect_fonts({ self.compiler_type: section }))
+        # Images of the sources directory the modules refer to (dice, icons)
+        for module_config in ModuleConfig.compile_all(self.compiler_type).values():
+            _files.extend(self.sources_directory + _value for _value in module_config.values.values() if isinstance(_value, str) and os.path.isfile(self.sources_directory + _value))
+        for _path in _files:
+            _hash.update("{path}:{hash}".format(path=_path, hash=FileHashCache.get_hash(_path)).encode('utf-8'))
+
+        result = _hash.hexdigest()
+        CompilerBase.__config_hashes[self.compiler_type] = (ConfigLoader.generation, result)
+        return result
+
+    # Returns the output filenames of the opened card for the profiles
+    def get_output_filenames(self, profiles):
+        name = self.output_name or self.raw.get('name', None)
+        return [ profile.exporter.get_filename(self.output_directory + profile.directory_suffix, name) for profile in profiles ]
+
+    def prepare_base(self):
+        name_template = ConfigLoader.get_from_config('compilerTypeSpecific/{type}/baseNameTemplate'.format(type=self.compiler_type), 'compilers')
+        filepath = self.get_base_path()
         if (not os.path.isfile(filepath)):
             additional = ""
             if ("{weaponsCount}" in name_template):
@@ -120,7 +287,7 @@ class CompilerBase():
             logger.error("Cannot load {type} card template{additional}: '{filepath}'".format(type=self.compiler_type, filepath=filepath, additional=additional))
             return None
 
-        base = Image.open(filepath)
+        base = TemplateCache.get_template(filepath)
         logger.info("Base prepared")
         return base
 
@@ -172,7 +339,27 @@ class CompilerBase():
         self.compiled_modules[index] = module_object.compile()
         return module_object
 
-    def save(self, forced_width=None):
+    # Returns the output profiles by the names (case-insensitive), the default ones of the compiler type if names are not set
+    def get_output_profiles(self, names=None):
+        if (names is None):
+            names = ConfigLoader.get_from_config('compilerTypeSpecific/{type}/defaultOutputProfiles'.format(type=self.compiler_type), 'compilers') or [ ]
+        elif (isinstance(names, str)):
+            names = [ _name.strip() for _name in names.split(',') if _name.strip() ]
+
+        if ([ _name for _name in names if _name.lower() == 'all' ]):
+            return list(self.output_profiles.values())
+
+        result = [ ]
+        for _name in names:
+            profile = self.output_profiles.get(_name.lower(), None)
+            if (profile is None):
+                raise CompilerError("Unknown {type} output profile: '{name}'. Available profiles: {profiles}".format(type=self.compiler_type, name=_name, profiles=', '.join(self.output_profiles)))
+            result.append(profile)
+
+        return result
+
+    # Saves the compiled image. With the profiles, saves every variant from the same compiled image (see get_variants()) and returns the list of filenames.
+    def save(self, forced_width=None, profiles=None):
         if (not self.compiled):
             logger.error("Could not save not compiled result")
             return None
@@ -182,20 +369,47 @@ class CompilerBase():
             logger.error("Could find proper name")
             return None
 
-        _image = self.compiled
-        if (forced_width):
-            _estimated_width = forced_width
+        if (profiles is None):
+            _image = self.exporter.resize(self.compiled, forced_width) if (forced_width) else self.compiled
+            return self.__save_variant(_image, name, self.output_directory, self.exporter)
 
-            _actual_width = _image.width
-            _actual_height = _image.height
-            _image = _image.resize((int(_estimated_width), int(_estimated_width / _actual_width * _actual_height)), Image.ANTIALIAS)
+        filenames = [ ]
+        for profile, image in zip(profiles, self.get_variants(profiles)):
+            filename = self.__save_variant(image, name, self.output_directory + profile.directory_suffix, profile.exporter)
+            if (not filename):
+                return None
+            filenames.append(filename)
 
-        filename = "{directory}{name}.png".format(directory=self.output_directory, name=name)
+        return filenames
+
+    # Returns the compiled image resized for each of the profiles, in the order of the profiles.
+    # The variants are resized in a cascade, each from the closest larger one.
+    def get_variants(self, profiles) -> list:
+        variants = [ None ] * len(profiles)
+        _order = sorted(range(len(profiles)), key=lambda i: -(profiles[i].width or self.compiled.width))
+        _image = self.compiled
+        for i in _order:
+            profile = profiles[i]
+            _source = _image if (not profile.width or profile.width <= _image.width) else self.compiled
+            _image = profile.exporter.resize(_source, profile.width) if (profile.width) else _source
+            variants[i] = _image
+
+        return variants
+
+    # Files are written atomically: to a temporary file first, which replaces the output when it is complete
+    def __save_variant(self, image, name, directory, exporter):
+        filename = exporter.get_filename(directory, name)
+        _tmp_filename = filename + '.tmp'
         try:
             logger.info("Saving compiled file: '{filename}'".format(filename=filename))
-            _image.save(filename)
+            if (directory):
+                os.makedirs(directory, exist_ok=True)
+            exporter.save(image, _tmp_filename)
+            os.replace(_tmp_filename, filename)
         except:
             logger.exception("Error while saving file '{filename}'".format(filename=filename))
+            if (os.path.isfile(_tmp_filename)):
+                os.remove(_tmp_filename)
             return None
         else:
             return filename
@@ -278,21 +492,23 @@ class CompilerBase():
 
     def __print_table_row(self, y1, y2, text_drawer, vertical_columns, table_row, data_row):
         max_h = 0
+        layouts = []
         for i, _cell in enumerate(table_row):
             x1 = vertical_columns[i]
             x2 = vertical_columns[i + 1]
-            _, _h = text_drawer.get_text_size((x1, y1, x2, y2), _cell.format(**data_row), offset_borders=False)
-            if (max_h < _h):
-                max_h = _h
+            _layout = text_drawer.get_text_layout((x1, y1, x2, y2), _cell.format(**data_row), offset_borders=False)
+            layouts.append(_layout)
+            if (max_h < _layout.height):
+                max_h = _layout.height
 
         _y1 = -y1 - max_h if (y1 < 0) else y1
         _y2 = (-y2 - max_h if (y2 < 0) else y2) if y2 else _y1 + max_h
 
-        for i, _cell in enumerate(table_row):
+        for i, _layout in enumerate(layouts):
             x1 = vertical_columns[i]
             x2 = vertical_columns[i + 1]
 
-            text_drawer.print_in_region((x1, _y1, x2, _y2), _cell.format(**data_row), offset_borders=False)
+            text_drawer.print_layout(_layout, (x1, _y1, x2, _y2), offset_borders=False)
 
         return max_h
 
@@ -305,42 +521,40 @@ class CompilerBase():
             h = y2 - y
 
         logger.debug("Inserting image '{path}' to position {region} with scaling and reversed mask".format(path=image_path, region=region))
-        image = Image.open(image_path)
+        # Only the header is read here, the pixels are decoded by the scaled image cache on miss
+        with Image.open(image_path) as image:
+            _actual_width = image.width
+            _actual_height = image.height
 
         _estimated_width = w
         _estimated_height = h
 
-        _actual_width = image.width
-        _actual_height = image.height
-
         _width_scale = _estimated_width / _actual_width
         _height_scale = _estimated_height / _actual_height
 
         _new_scale = max(_width_scale, _height_scale)
-        _image = image.resize((int(_new_scale * _actual_width), int(_new_scale * _actual_height)), Image.ANTIALIAS)
+        _image = ScaledImageCache.get_scaled(image_path, (int(_new_scale * _actual_width), int(_new_scale * _actual_height)), Image.ANTIALIAS)
+
+        # Only the part of the card covered by the image is changed, so only it is copied and put back over the image
+        _box = (max(x, 0), max(y, 0), min(x + _image.width, base_image.width), min(y + _image.height, base_image.height))
+        if (_box[0] >= _box[2] or _box[1] >= _box[3]):
+            return base_image
 
-        _im_copy = base_image.copy()
+        _im_copy = base_image.crop(_box)
         base_image.paste(_image, (x, y))
-        base_image.paste(_im_copy, (0, 0), _im_copy)
+        base_image.paste(_im_copy, _box[:2], _im_copy)
         return base_image
 
     def get_image_size(self, image_path):
-        image = Image.open(image_path)
-        _w = image.width
-        _h = image.height
-        return _w, _h
+        return AssetCache.get_asset(image_path).size
 
     def insert_image_centered(self, base_image, position, image_path, offset_borders=True):
         x, y = position
 
         logger.debug("Inserting image '{path}' to position {position}".format(path=image_path, position=position))
-        image = Image.open(image_path)
-        _w = image.width
-        _h = image.height
+        asset = AssetCache.get_asset(image_path)
+        _w, _h = asset.size
 
         _x = x - _w // 2; _y = y - _h // 2
-        _image = image
-        if (image.mode.endswith('A')):
-            _image = image.convert(image.mode[:-1])
-        base_image.paste(_image, (_x, _y), image)
+        base_image.paste(asset.color, (_x, _y), asset.mask)
         return _x, _y, _w, _h
@@ -1,11 +1,11 @@
 from PIL import Image
 from logging import getLogger
-from camel_case_switcher import dict_keys_camel_case_to_underscope
 
 from hammerhal.config_loader import ConfigLoader
 from hammerhal.text_drawer import TextDrawer
 from hammerhal.compilers.compiler_error import CompilerError
 from hammerhal.compilers.compiler_base import CompilerBase
+from hammerhal.compilers.module_config import ModuleConfig
 
 class CompilerModuleBase:
 
@@ -17,6 +17,7 @@ class CompilerModuleBase:
     parent = None
     parent_type = None
     logger = None
+    module_config = None
 
     width = None
     height = None
@@ -36,12 +37,8 @@ class CompilerModuleBase:
         self.logger = getLogger(_logger_name)
 
         # Try config:
-        path = 'compilerTypeSpecific/{parentType}/modules/{moduleName}'.format \
-        (
-            parentType = self.parent_type,
-            moduleName = self.module_name,
-        )
-        if not (ConfigLoader.get_from_config(path, 'compilers')):
+        self.module_config = ModuleConfig.get_module_config(self.parent_type, self.module_name)
+        if not (self.module_config):
             message = "Module config not found: {parentType}/{moduleName}".format \
             (
                 parentType = self.parent_type,
@@ -56,19 +53,15 @@ class CompilerModuleBase:
         pass
 
     def get_from_module_config(self, key):
-        path = 'compilerTypeSpecific/{parentType}/modules/{moduleName}/{key}'.format \
-        (
-            parentType = self.parent_type,
-            moduleName = self.module_name,
-            key = key,
-        )
-        return ConfigLoader.get_from_config(path, 'compilers')
+        return self.module_config.get(key)
+
+    def get_color_from_module_config(self, key):
+        return self.module_config.get_color(key)
 
     def get_text_drawer(self, base:Image, font_prefix='font') -> TextDrawer:
-        td = TextDrawer(base)
-        font = self.get_from_module_config(font_prefix) or dict()
-        font = dict_keys_camel_case_to_underscope(font)
-        td.set_font(**font)
+        td = TextDrawer(base, render_mode=ConfigLoader.get_from_config('textRenderMode'), metrics_backend=ConfigLoader.get_from_config('textMetricsBackend'))
+        font = self.module_config.get_font(font_prefix)
+        td.set_font(**font.kwargs)
         return td
 
 
@@ -0,0 +1,60 @@
+import os, hashlib
+from logging import getLogger
+logger = getLogger('hammerhal.compilers.file_hash_cache')
+
+
+# Process-wide cache of the file content hashes (SHA-1), keyed by the path.
+# Files are hashed again only if their mtime or size changed.
+class FileHashCache:
+
+    # { path: ((mtime, size), hash) }
+    __hashes = {}
+
+    hits = 0
+    misses = 0
+
+    # Returns hex digest of the file content, or None if the file cannot be read
+    @staticmethod
+    def get_hash(path:str):
+        try:
+            _stat = os.stat(path)
+        except OSError:
+            return None
+
+        _key = (_stat.st_mtime_ns, _stat.st_size)
+        cached = FileHashCache.__hashes.get(path, None)
+        if (cached and cached[0] == _key):
+            FileHashCache.hits += 1
+            return cached[1]
+
+        FileHashCache.misses += 1
+        _hash = hashlib.sha1()
+        try:
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                    _hash.update(chunk)
+        except OSError:
+            logger.warning("Cannot hash file: {path}".format(path=path), exc_info=True)
+            return None
+
+        result = _hash.hexdigest()
+        FileHashCache.__hashes[path] = (_key, result)
+        return result
+
+    @staticmethod
+    def get_stats():
+        result_dict = \
+        {
+            'size': len(FileHashCache.__hashes),
+            'hits': FileHashCache.hits,
+            'misses': FileHashCache.misses,
+        }
+
+        return result_dict
+
+    @staticmethod
+    def clear():
+        logger.debug("Clearing file hash cache: {stats}".format(stats=FileHashCache.get_stats()))
+        FileHashCache.__hashes.clear()
+        FileHashCache.hits = 0
+        FileHashCache.misses = 0
@@ -0,0 +1,134 @@
+import threading
+from logging import getLogger
+
+from hammerhal.config_loader import ConfigLoader
+from hammerhal.text_drawer import TextDrawer, FontFinder, FontCache, FontMetricsCache
+logger = getLogger('hammerhal.compilers.font_preloader')
+
+
+# Resolves and loads every font declared in compilers.json up front,
+# so the modules do not block on the font discovery in the middle of rendering,
+# and missing fonts are reported before any card is compiled.
+class FontPreloader:
+
+    DEFAULT_FONT_NAME = 'Times New Roman'
+
+    __thread = None
+    __missing = None
+
+    # Returns list of (config path, font name, bold, italic, font size) of all the font declarations in the compilers config
+    @staticmethod
+    def collect_fonts(config=None):
+        if (config is None):
+            config = ConfigLoader.get_from_config('compilerTypeSpecific', 'compilers') or { }
+        result = []
+        FontPreloader.__collect(config, 'compilerTypeSpecific', result)
+        return result
+
+    # Returns list of the font declarations (see collect_fonts()) of the compiler type only
+    @staticmethod
+    def collect_compiler_fonts(compiler_type:str):
+        section = ConfigLoader.get_from_config('compilerTypeSpecific/{type}'.format(type=compiler_type), 'compilers') or { }
+        return FontPreloader.collect_fonts({ compiler_type: section })
+
+    @staticmethod
+    def __collect(node, path:str, result:list):
+        if (isinstance(node, dict)):
+            if ('fontName' in node or 'fontSize' in node):
+                result.append((path, node.get('fontName', None) or FontPreloader.DEFAULT_FONT_NAME, bool(node.get('bold', False)), bool(node.get('italic', False)), node.get('fontSize', None)))
+                return
+
+            for key, value in node.items():
+                FontPreloader.__collect(value, '{path}/{key}'.format(path=path, key=key), result)
+
+        elif (isinstance(node, list)):
+            for i, value in enumerate(node):
+                FontPreloader.__collect(value, '{path}/{i}'.format(path=path, i=i), result)
+
+    # Resolves and loads the fonts. Returns list of (font name, bold, italic) which are not installed.
+    @staticmethod
+    def preload(fonts=None):
+        if (fonts is None):
+            fonts = FontPreloader.collect_fonts()
+
+        font_finder = FontFinder()
+        analytic_metrics = (TextDrawer.MetricsBackends.find_value(ConfigLoader.get_from_config('textMetricsBackend')) == TextDrawer.MetricsBackends.FontTools)
+
+        missing = []
+        loaded = set()
+        for path, font_name, bold, italic, font_size in fonts:
+            for _bold, _italic, _filepath in FontPreloader.__get_variants(font_finder, font_name, bold, italic):
+                _requested = (_bold == bold and _italic == italic)
+                if (not _filepath):
+                    if (_requested and not (font_name, bold, italic) in missing):
+                        logger.error("Font is not installed: {font}{bold}{italic} (used in {path})".format(font=font_name, bold=", Bold" if bold else '', italic=", Italic" if italic else '', path=path))
+                        missing.append((font_name, bold, italic))
+                    elif (not _requested):
+                        logger.debug("Font style is not installed: {font}{bold}{italic}".format(font=font_name, bold=", Bold" if _bold else '', italic=", Italic" if _italic else ''))
+                    continue
+
+                if (font_size and not (_filepath, font_size) in loaded):
+                    FontCache.get_font(_filepath, int(font_size), 'unic')
+                    loaded.add((_filepath, font_size))
+                if (analytic_metrics):
+                    FontMetricsCache.get_metrics(_filepath)
+
+        logger.info("Fonts preloaded: {n} font instances, {m} missing".format(n=len(loaded), m=len(missing)))
+        return missing
+
+    # Returns list of (bold, italic, path or None) of the font files which could be used for the font declaration
+    @staticmethod
+    def __get_variants(font_finder:FontFinder, font_name:str, bold:bool, italic:bool):
+        _filepath = font_finder.find_font_file_by_filename(font_name)
+        if (_filepath):
+            # Loaded by the filename, the style does not change the file
+            return [ (bold, italic, _filepath) ]
+
+        # Markup could switch any of the styles of the family, so all of them are used
+        return [ (_bold, _italic, font_finder.find_font_file_by_fontname(family_name=font_name, bold=_bold, italic=_italic)) for _bold in (False, True) for _italic in (False, True) ]
+
+    # Returns sorted list of the installed font files which could be used by the fonts (all the declarations by default)
+    @staticmethod
+    def get_font_files(fonts=None):
+        if (fonts is None):
+            fonts = FontPreloader.collect_fonts()
+
+        font_finder = FontFinder()
+        result = set()
+        for _, font_name, bold, italic, _ in fonts:
+            result.update(_filepath for _, _, _filepath in FontPreloader.__get_variants(font_finder, font_name, bold, italic) if _filepath)
+
+        return sorted(result)
+
+    # Starts preload() on the background thread, so it could be overlapped with raw loading and validation
+    @staticmethod
+    def start():
+        if (FontPreloader.__thread is not None):
+            return
+
+        FontPreloader.__missing = None
+        FontPreloader.__thread = threading.Thread(target=FontPreloader.__run, name='FontPreloader', daemon=True)
+        FontPreloader.__thread.start()
+
+    @staticmethod
+    def __run():
+        try:
+            FontPreloader.__missing = FontPreloader.preload()
+        except:
+            logger.exception("Error while preloading fonts")
+            FontPreloader.__missing = [ ]
+
+    # Waits for the background preload. Returns list of missing fonts, only the ones used by the compiler type if it is set,
+    # or None if the preload was not started.
+    @staticmethod
+    def wait(compiler_type:str=None):
+        if (FontPreloader.__thread is None):
+            return None
+
+        FontPreloader.__thread.join()
+        missing = FontPreloader.__missing
+        if (compiler_type is not None):
+            _declared = { (font_name, bold, italic) for _, font_name, bold, italic, _ in FontPreloader.collect_compiler_fonts(compiler_type) }
+            missing = [ _font for _font in missing if _font in _declared ]
+
+        return missing
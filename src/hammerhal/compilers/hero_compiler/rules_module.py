@@ -1,6 +1,5 @@
 from PIL import Image, ImageDraw, ImageColor
 
-from hammerhal import get_color
 from hammerhal.compilers.compiler_module_base import CompilerModuleBase
 
 
@@ -9,25 +8,31 @@ class HeroRulesModule(CompilerModuleBase):
 
     def _compile(self, base):
         td = self.get_text_drawer(base)
-        y = 0; light = not(len(self.parent.raw['abilities']) & 1)
-        gradient_base = self.__get_gradient_image()
-
+        blocks = []
         for ability in self.parent.raw['abilities']:
             if (ability.get('cost', None)):
                 text = "**{name} ({cost}+):** {description}".format(**ability)
             else:
                 text = "**{name}:** {description}".format(**ability)
-
-            _h = self.__print_rules_block(base, td, y, text, light, gradient_base, dice_space=ability['diceSpace'])
-            y += _h
-            light = not light
+            blocks.append((text, ability['diceSpace']))
 
         text_traits = "**TRAITS:** The {name} is **{trait_1}** and **{trait_2}**.".format(name=self.parent.raw['name'], trait_1=self.parent.raw['traits'][0].capitalize(), trait_2=self.parent.raw['traits'][1].capitalize())
         text_renown = "**RENOWN:** {description}".format(description=self.parent.raw['renown'])
         text = text_traits + '\n' + text_renown
-        _h = self.__print_rules_block(base, td, y, text, light, gradient_base)
-        y += _h
-        light = not light
+        blocks.append((text, False))
+
+        if (self.get_from_module_config('fitToRegion')):
+            _fits = lambda: sum(self.__print_rules_block(None, td, 0, text, False, None, dice_space=dice_space, real_print=False) for text, dice_space in blocks) <= self.height
+            _font_size = td.fit_font_size(_fits, min_font_size=self.get_from_module_config('minFontSize'))
+            self.logger.debug("Rules font size: {size}".format(size=_font_size))
+
+        y = 0; light = not(len(self.parent.raw['abilities']) & 1)
+        gradient_base = self.__get_gradient_image()
+        for text, dice_space in blocks:
+            _h = self.__print_rules_block(base, td, y, text, light, gradient_base, dice_space=dice_space)
+            y += _h
+            light = not light
+
         self.logger.info("Rules printed")
 
     def __get_gradient_image(self):
@@ -44,8 +49,8 @@ class HeroRulesModule(CompilerModuleBase):
             x1 = _gradient_section[i]['position']
             x2 = _gradient_section[i+1]['position']
 
-            _color1 = get_color(_gradient_section[i]['color'])
-            _color2 = get_color(_gradient_section[i+1]['color'])
+            _color1 = self.get_color_from_module_config('gradient/{i}/color'.format(i=i))
+            _color2 = self.get_color_from_module_config('gradient/{i}/color'.format(i=i + 1))
 
             r1, g1, b1, a1 = _color1
             r2, g2, b2, a2 = _color2
@@ -59,17 +64,21 @@ class HeroRulesModule(CompilerModuleBase):
 
         return im
 
-    def __print_rules_block(self, base:Image, text_drawer, y:int, text:str, light:bool, gradient_base:Image, dice_space:bool=False):
+    def __print_rules_block(self, base:Image, text_drawer, y:int, text:str, light:bool, gradient_base:Image, dice_space:bool=False, real_print:bool=True):
         x1 = self.get_from_module_config('textLeft'); x2 = self.get_from_module_config('textWidthWithDice') if dice_space else self.get_from_module_config('textWidthNoDice')
         dy = self.parent.raw.get('rulesSeparatorHeight', self.get_from_module_config("defaultRulesSeparatorHeight"))
 
-        _, _h = text_drawer.get_text_size((x1, y, x2, 0), text, offset_borders=False)
+        layout = text_drawer.get_text_layout((x1, y, x2, 0), text, offset_borders=False)
+        _h = layout.height
 
         if (dice_space):
             _, _h2 = self.parent.get_image_size(self.parent.sources_directory + "dice.png")
             _h = max(_h, _h2)
         _h += dy
 
+        if (not real_print):
+            return _h
+
         if (light):
             _w = gradient_base.width
             gradient = gradient_base.resize((_w, _h))
@@ -82,5 +91,5 @@ class HeroRulesModule(CompilerModuleBase):
             self.parent.insert_image_centered(base, (_x, _y), self.parent.sources_directory + self.get_from_module_config("diceImage"))
 
         # -5 because of not correct intuitive of text while on print
-        text_drawer.print_in_region((x1, y - 5, x2, y - 5 + _h), text, offset_borders=False)
+        text_drawer.print_layout(layout, (x1, y - 5, x2, y - 5 + _h), offset_borders=False)
         return _h
@@ -0,0 +1,192 @@
+from io import BytesIO
+from PIL import Image
+from camel_case_switcher import dict_keys_camel_case_to_underscope
+
+from hammerhal import get_color
+from hammerhal.config_loader import ConfigLoader
+from hammerhal.text_drawer import Enum
+from hammerhal.compilers.compiler_error import CompilerError
+from logging import getLogger
+logger = getLogger('hammerhal.compilers.image_exporter')
+
+
+# Export stage of the compiled cards: downscaling and encoding, configured per compiler type
+# in the 'compilerTypeSpecific/{type}/export' section of compilers.json.
+class ImageExporter:
+
+    class Formats(Enum):
+        PNG = 'PNG'
+        WebP = 'WEBP'
+        JPEG = 'JPEG'
+
+    class Filters(Enum):
+        Nearest = Image.NEAREST
+        Bilinear = Image.BILINEAR
+        Bicubic = Image.BICUBIC
+        Lanczos = Image.LANCZOS
+
+    __EXTENSIONS = \
+    {
+        Formats.PNG: 'png',
+        Formats.WebP: 'webp',
+        Formats.JPEG: 'jpg',
+    }
+
+    __DEFAULTS = \
+    {
+        # Output format: PNG, WebP or JPEG
+        'format': 'PNG',
+        # Final resampling filter
+        'resample': 'Lanczos',
+        # If set, the image is reduced by an integer factor first while it is larger than reducing_gap times the target,
+        # and only the rest is resampled with the filter. None means a single pass of the filter.
+        'reducing_gap': None,
+        # PNG zlib level: 0 (fastest) - 9 (smallest)
+        'compress_level': 6,
+        # Number of palette colors (2 - 256) to quantize to, None to keep the true color
+        'quantize': None,
+        # WebP and JPEG quality, 0 - 100
+        'quality': 90,
+        # WebP only: lossless encoding and the encoder effort, 0 (fastest) - 6 (smallest)
+        'lossless': False,
+        'method': 4,
+        # JPEG has no alpha, transparent parts are put over this color
+        'background': '#ffffff',
+    }
+
+    format = None
+    resample = None
+    reducing_gap = None
+    compress_level = None
+    quantize = None
+    quality = None
+    lossless = None
+    method = None
+    background = None
+
+    def __init__(self, settings:dict=None, path:str='export'):
+        kwargs = dict(ImageExporter.__DEFAULTS)
+        for key, value in dict_keys_camel_case_to_underscope(settings or { }).items():
+            if (not key in ImageExporter.__DEFAULTS):
+                raise CompilerError("Unknown export property in {path}: '{key}'".format(path=path, key=key))
+            kwargs[key] = value
+
+        self.format = ImageExporter.Formats.find_value(kwargs['format'])
+        if (not self.format in ImageExporter.__EXTENSIONS):
+            raise CompilerError("Unknown format in {path}: '{value}'".format(path=path, value=kwargs['format']))
+
+        self.resample = ImageExporter.Filters.find_value(kwargs['resample'])
+        if (not isinstance(self.resample, int)):
+            raise CompilerError("Unknown resample filter in {path}: '{value}'".format(path=path, value=kwargs['resample']))
+
+        try:
+            self.background = get_color(kwargs['background'])
+        except ValueError:
+            raise CompilerError("Invalid color in {path}/background: '{value}'".format(path=path, value=kwargs['background']))
+
+        self.reducing_gap = kwargs['reducing_gap']
+        self.compress_level = kwargs['compress_level']
+        self.quantize = kwargs['quantize'] or None
+        self.quality = kwargs['quality']
+        self.lossless = kwargs['lossless']
+        self.method = kwargs['method']
+
+    @staticmethod
+    def from_config(compiler_type:str):
+        path = 'compilerTypeSpecific/{type}/export'.format(type=compiler_type)
+        return ImageExporter(ConfigLoader.get_from_config(path, 'compilers'), path)
+
+    @property
+    def extension(self):
+        return ImageExporter.__EXTENSIONS[self.format]
+
+    # Returns the image scaled to the width, keeping the aspect ratio
+    def resize(self, image:Image.Image, width:int) -> Image.Image:
+        width = int(width)
+        if (width == image.width):
+            return image
+
+        _height = int(width / image.width * image.height)
+        _mode = image.mode
+
+        # Pillow drops reducing_gap for the images with alpha, so the steps are done here.
+        # Alpha is premultiplied first, as Image.resize() does, so transparent pixels do not bleed.
+        _premultiplied = _mode in ('RGBA', 'LA')
+        if (_premultiplied):
+            image = image.convert(_mode[:-1] + 'a')
+
+        if (self.reducing_gap):
+            _factor = (max(int(image.width / width / self.reducing_gap), 1), max(int(image.height / _height / self.reducing_gap), 1))
+            if (_factor != (1, 1)):
+                image = image.reduce(_factor)
+
+        image = image.resize((width, _height), self.resample)
+        if (_premultiplied):
+            image = image.convert(_mode)
+
+        return image
+
+    # Returns the image encoded in the configured format
+    def encode(self, image:Image.Image) -> bytes:
+        buffer = BytesIO()
+        self.save(image, buffer)
+        return buffer.getvalue()
+
+    # Saves the image to the filename (with extension) or the file object in the configured format
+    def save(self, image:Image.Image, filename):
+        image = self.__prepare(image)
+        if (self.format == ImageExporter.Formats.PNG):
+            image.save(filename, format=self.format, compress_level=self.compress_level)
+        elif (self.format == ImageExporter.Formats.WebP):
+            image.save(filename, format=self.format, quality=self.quality, lossless=self.lossless, method=self.method)
+        else:
+            image.save(filename, format=self.format, quality=self.quality, optimize=True)
+
+    def __prepare(self, image:Image.Image):
+        if (self.format == ImageExporter.Formats.JPEG):
+            if (image.mode.endswith('A')):
+                _background = Image.new('RGB', image.size, self.background[:3])
+                _background.paste(image.convert('RGB'), (0, 0), image.getchannel('A'))
+                image = _background
+            elif (image.mode != 'RGB'):
+                image = image.convert('RGB')
+
+        elif (self.quantize):
+            # Fast octree is the only built-in method which keeps the alpha
+            image = image.quantize(colors=self.quantize, method=Image.FASTOCTREE)
+
+        return image
+
+    def get_filename(self, directory:str, name:str):
+        return "{directory}{name}.{extension}".format(directory=directory, name=name, extension=self.extension)
+
+# Output variant of the compiled card: target width (None for the full resolution), export settings and the output subdirectory.
+# Profiles are configured per compiler type in 'compilerTypeSpecific/{type}/outputProfiles',
+# the export settings of a profile override the ones of the 'export' section.
+class OutputProfile:
+    __slots__ = ('name', 'width', 'directory_suffix', 'exporter')
+
+    def __init__(self, name:str, width:int=None, directory_suffix:str='', exporter:ImageExporter=None):
+        self.name = name
+        self.width = width and int(width)
+        self.directory_suffix = directory_suffix or ''
+        self.exporter = exporter or ImageExporter()
+
+    # Returns { name: OutputProfile } of the compiler type
+    @staticmethod
+    def from_config(compiler_type:str) -> dict:
+        export_settings = ConfigLoader.get_from_config('compilerTypeSpecific/{type}/export'.format(type=compiler_type), 'compilers') or { }
+        section = ConfigLoader.get_from_config('compilerTypeSpecific/{type}/outputProfiles'.format(type=compiler_type), 'compilers') or { }
+
+        result = { }
+        for name, settings in section.items():
+            path = 'compilerTypeSpecific/{type}/outputProfiles/{name}'.format(type=compiler_type, name=name)
+            _settings = dict(settings)
+            width = _settings.pop('width', None)
+            directory_suffix = _settings.pop('directorySuffix', None)
+            result[name.lower()] = OutputProfile(name.lower(), width, directory_suffix, ImageExporter(dict(export_settings, **_settings), path))
+
+        return result
+
+    def __repr__(self):
+        return "OutputProfile({name}, width={width}, format={format}, directory='{suffix}')".format(name=self.name, width=self.width, format=self.exporter.format, suffix=self.directory_suffix)
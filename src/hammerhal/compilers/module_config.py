@@ -0,0 +1,135 @@
+from logging import getLogger
+from camel_case_switcher import camel_case_to_underscope
+
+from hammerhal import get_color
+from hammerhal.config_loader import ConfigLoader
+from hammerhal.text_drawer import TextDrawer
+from hammerhal.compilers.compiler_error import CompilerError
+logger = getLogger('hammerhal.compilers.module_config')
+
+
+# Font section of the module config, normalized to TextDrawer.set_font() arguments:
+# color parsed, alignment and capitalization resolved to the enum values.
+class FontSpec:
+    __slots__ = ('font_name', 'font_size', 'color', 'bold', 'italic', 'horizontal_alignment', 'vertical_alignment', 'character_width_scale', 'space_scale', 'vertical_space_scale', 'paragraph_vertical_space', 'character_separator_scale', 'capitalization', 'kwargs')
+
+    __ENUMS = \
+    {
+        'horizontal_alignment': TextDrawer.TextAlignment,
+        'vertical_alignment': TextDrawer.TextAlignment,
+        'capitalization': TextDrawer.CapitalizationModes,
+    }
+
+    # Errors name the config key path, i.e. 'compilerTypeSpecific/hero/modules/stats/font/fontSize'
+    def __init__(self, path:str, section:dict):
+        kwargs = { }
+        for name, value in (section or { }).items():
+            key = camel_case_to_underscope(name)
+            _path = '{path}/{name}'.format(path=path, name=name)
+            if (key == 'kwargs' or not key in FontSpec.__slots__):
+                raise CompilerError("Unknown font property: {path}".format(path=_path))
+
+            if (key in FontSpec.__ENUMS and value is not None):
+                _value = FontSpec.__ENUMS[key].find_value(value)
+                if (not isinstance(_value, int)):
+                    raise CompilerError("Unknown {key} in {path}: '{value}'".format(key=key, path=_path, value=value))
+                value = _value
+            elif (key == 'color' and value is not None):
+                value = ModuleConfig.parse_color(_path, value)
+
+            kwargs[key] = value
+
+        for key in FontSpec.__slots__:
+            object.__setattr__(self, key, kwargs.get(key, None))
+        object.__setattr__(self, 'kwargs', kwargs)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("FontSpec is immutable")
+
+# Module section of compilers.json, compiled once per config generation.
+# Every key path inside the section ('width', 'font/fontSize', 'gradient/0/color') is resolved in O(1),
+# fonts ('font' and 'fonts/*') are compiled to FontSpec and colors (keys 'color' or '*Color') are parsed.
+class ModuleConfig:
+    __slots__ = ('compiler_type', 'module_name', 'values', 'colors', 'fonts')
+
+    __EMPTY_FONT = None
+
+    # { compiler type: (config generation, { module name: ModuleConfig }) }
+    __compiled = {}
+
+    def __init__(self, compiler_type:str, module_name:str, section:dict):
+        path = 'compilerTypeSpecific/{type}/modules/{name}'.format(type=compiler_type, name=module_name)
+        values = { }
+        colors = { }
+        fonts = { }
+        ModuleConfig.__flatten(path, '', section, values, colors, fonts)
+
+        object.__setattr__(self, 'compiler_type', compiler_type)
+        object.__setattr__(self, 'module_name', module_name)
+        object.__setattr__(self, 'values', values)
+        object.__setattr__(self, 'colors', colors)
+        object.__setattr__(self, 'fonts', fonts)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ModuleConfig is immutable")
+
+    @staticmethod
+    def __flatten(root:str, prefix:str, node, values:dict, colors:dict, fonts:dict):
+        if (isinstance(node, dict)):
+            items = node.items()
+        elif (isinstance(node, list)):
+            items = enumerate(node)
+        else:
+            return
+
+        for key, value in items:
+            _key = '{prefix}{key}'.format(prefix=prefix, key=key)
+            values[_key] = value
+
+            if (isinstance(key, str) and (key == 'color' or key.endswith('Color'))):
+                colors[_key] = ModuleConfig.parse_color('{root}/{key}'.format(root=root, key=_key), value)
+
+            if (_key == 'font' or (prefix == 'fonts/' and isinstance(value, dict))):
+                fonts[_key] = FontSpec('{root}/{key}'.format(root=root, key=_key), value)
+            ModuleConfig.__flatten(root, _key + '/', value, values, colors, fonts)
+
+    @staticmethod
+    def parse_color(path:str, value):
+        try:
+            return get_color(value)
+        except ValueError:
+            raise CompilerError("Invalid color in {path}: '{value}'".format(path=path, value=value))
+
+    def get(self, key:str):
+        return self.values.get(key, None)
+
+    def get_color(self, key:str):
+        return self.colors.get(key, None)
+
+    def get_font(self, key:str) -> FontSpec:
+        result = self.fonts.get(key, None)
+        if (result is None):
+            if (ModuleConfig.__EMPTY_FONT is None):
+                ModuleConfig.__EMPTY_FONT = FontSpec('', None)
+            result = ModuleConfig.__EMPTY_FONT
+
+        return result
+
+    # Returns ModuleConfig of the module, or None if the config has no such module.
+    # All the modules of the compiler type are compiled (and validated) at once, and recompiled after the configs reload.
+    @staticmethod
+    def get_module_config(compiler_type:str, module_name:str):
+        return ModuleConfig.compile_all(compiler_type).get(module_name, None)
+
+    @staticmethod
+    def compile_all(compiler_type:str) -> dict:
+        cached = ModuleConfig.__compiled.get(compiler_type, None)
+        if (cached and cached[0] == ConfigLoader.generation):
+            return cached[1]
+
+        section = ConfigLoader.get_from_config('compilerTypeSpecific/{type}/modules'.format(type=compiler_type), 'compilers') or { }
+        result = { module_name: ModuleConfig(compiler_type, module_name, module_section) for module_name, module_section in section.items() if module_section }
+        logger.debug("Module configs compiled for {type}: {modules}".format(type=compiler_type, modules=', '.join(result)))
+
+        ModuleConfig.__compiled[compiler_type] = (ConfigLoader.generation, result)
+        return result
@@ -1,7 +1,6 @@
 from PIL import Image, ImageDraw, ImageColor
 
 from hammerhal.compilers import CompilerModuleBase, CompilerError
-from hammerhal import get_color
 
 
 class BehaviourTableModule(CompilerModuleBase):
@@ -49,7 +48,7 @@ class BehaviourTableModule(CompilerModuleBase):
             _y1 = y1 + _i
             _x2 = x2 - _i
             _y2 = y2 - _i
-            drawer.rectangle([(_x1, _y1), (_x2, _y2)], outline=get_color(self.get_from_module_config("borderColor")))
+            drawer.rectangle([(_x1, _y1), (_x2, _y2)], outline=self.get_color_from_module_config("borderColor"))
         behaviour_table_height -= self.get_from_module_config("borderTopOffset")
 
         self.logger.info("Behaviour table printed")
@@ -20,5 +20,11 @@ class TextModule(CompilerModuleBase):
             if (_scale != 1.0):
                 td.set_font(font_size=td.get_font()['font_size'] * _scale)
 
-        td.print_in_region((0, 0, self.width, self.height), self.parent.raw[self.raw_field], offset_borders=True)
+        region = (0, 0, self.width, self.height)
+        text = self.parent.raw[self.raw_field]
+        if (self.get_from_module_config('fitToRegion')):
+            layout = td.fit_text_layout(region, text, offset_borders=True, min_font_size=self.get_from_module_config('minFontSize'))
+            td.print_layout(layout, region, offset_borders=True)
+        else:
+            td.print_in_region(region, text, offset_borders=True)
         self.logger.info("{type} printed".format(type=self.module_name.capitalize()))
@@ -0,0 +1,156 @@
+import os, json
+from difflib import SequenceMatcher
+from logging import getLogger
+logger = getLogger('hammerhal.compilers.raw_index')
+
+
+# Persistent index of the raw files of one raw directory: name, subtitle, mtime and size of every file, keyed by the absolute path.
+# Stored as JSON in the cache directory and refreshed incrementally: only new or modified files are read.
+class RawIndex:
+
+    VERSION = 2
+
+    # Candidates with the similarity ratio below this are not considered as fuzzy matches
+    fuzzy_threshold = 0.6
+
+    # Match kinds, lower is better
+    EXACT = 0
+    PREFIX = 1
+    SUBSTRING = 2
+    SUBTITLE = 3
+    FUZZY = 4
+
+    path = None
+    entries = None
+    __modified = False
+
+    def __init__(self, path:str):
+        self.path = path
+        self.entries = {}
+        self.__load()
+
+    def __load(self):
+        if (not self.path or not os.path.isfile(self.path)):
+            return
+
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            logger.warning("Raw index is corrupted and will be rebuilt: {path}".format(path=self.path), exc_info=True)
+            return
+
+        if (data.get('version', None) != RawIndex.VERSION):
+            logger.info("Raw index format changed, rebuilding it")
+            return
+
+        self.entries = data.get('entries', {})
+        logger.debug("Raw index loaded: {n} files".format(n=len(self.entries)))
+
+    def save(self):
+        if (not self.path or not self.__modified):
+            return
+
+        data = \
+        {
+            'version': RawIndex.VERSION,
+            'entries': self.entries,
+        }
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            _tmp_path = self.path + '.tmp'
+            with open(_tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+            os.replace(_tmp_path, self.path)
+        except OSError:
+            logger.warning("Cannot save raw index: {path}".format(path=self.path), exc_info=True)
+        else:
+            self.__modified = False
+            logger.debug("Raw index saved: {path}".format(path=self.path))
+
+    # Brings the index up to date with the given raw files and saves it if anything changed
+    def refresh(self, filenames):
+        found = {}
+        for _path in map(os.path.abspath, filenames):
+            try:
+                _stat = os.stat(_path)
+            except OSError:
+                continue
+            found[_path] = (_stat.st_mtime_ns, _stat.st_size)
+
+        removed = [ _path for _path in self.entries if not _path in found ]
+        for _path in removed:
+            del self.entries[_path]
+
+        changed = [ _path for _path, (_mtime, _size) in found.items() if not RawIndex.__is_actual(self.entries.get(_path, None), _mtime, _size) ]
+        for _path in changed:
+            entry = RawIndex.read_raw_entry(_path)
+            entry['mtime'], entry['size'] = found[_path]
+            self.entries[_path] = entry
+
+        if (removed or changed):
+            logger.debug("Raw index refreshed: {new} files read, {removed} removed, {total} indexed".format(new=len(changed), removed=len(removed), total=len(self.entries)))
+            self.__modified = True
+            self.save()
+
+    @staticmethod
+    def __is_actual(entry, mtime, size):
+        return entry is not None and entry.get('mtime', None) == mtime and entry.get('size', None) == size
+
+    @staticmethod
+    def read_raw_entry(path:str) -> dict:
+        try:
+            with open(path, encoding='utf-8') as file:
+                raw = json.load(file)
+        except (OSError, ValueError):
+            return { }
+
+        if (not isinstance(raw, dict)):
+            return { }
+
+        _name = raw.get('name', None)
+        _subtitle = raw.get('subtitle', None)
+        result = \
+        {
+            'name': _name if isinstance(_name, str) else None,
+            'subtitle': _subtitle if isinstance(_subtitle, str) else None,
+        }
+
+        return result
+
+    # Returns list of (match kind, filename, name, subtitle) of the files matching the query, the best ones first.
+    # Query is matched against the file name, the name and the subtitle: exactly, as prefix, as substring, then fuzzy.
+    def search(self, query:str):
+        _query = query.strip().lower()
+        if (not _query):
+            return [ ]
+
+        candidates = []
+        for _path, entry in self.entries.items():
+            _name = entry.get('name', None)
+            _subtitle = entry.get('subtitle', None)
+            _score = RawIndex.__match(_query, os.path.splitext(os.path.basename(_path))[0].lower(), (_name or '').lower(), (_subtitle or '').lower())
+            if (_score is not None):
+                candidates.append((_score, _name or '', _path, _subtitle))
+
+        candidates.sort()
+        return [ (int(_score), _path, _name, _subtitle) for _score, _name, _path, _subtitle in candidates ]
+
+    # Returns the score of the match (kind plus fraction for the fuzzy ones), or None
+    @staticmethod
+    def __match(query:str, stem:str, name:str, subtitle:str):
+        if (query == name or query == stem):
+            return RawIndex.EXACT
+        if (name.startswith(query)):
+            return RawIndex.PREFIX
+        if (query in name or query in stem):
+            return RawIndex.SUBSTRING
+        if (subtitle and (query in subtitle or query == "{name} ({subtitle})".format(name=name, subtitle=subtitle))):
+            return RawIndex.SUBTITLE
+
+        _ratio = max(SequenceMatcher(None, query, _value).ratio() for _value in (name, stem))
+        if (_ratio >= RawIndex.fuzzy_threshold):
+            return RawIndex.FUZZY + (1 - _ratio)
+
+        return None
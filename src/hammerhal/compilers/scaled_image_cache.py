@@ -0,0 +1,222 @@
+import os, time
+from PIL import Image
+from hammerhal.cache_directory import get_cache_directory
+from hammerhal.compilers.file_hash_cache import FileHashCache
+from logging import getLogger
+logger = getLogger('hammerhal.compilers.scaled_image_cache')
+
+
+# On-disk cache of the resized images (portraits), keyed by (source file hash, target size, resampling filter, decoding pipeline).
+# Images are stored as PNG, so the cached result is exactly the same as the resized one.
+# Rebuilding a card with the unchanged portrait reads the scaled image instead of resampling the source again.
+# The directory is bounded by max_bytes: the least recently used images (by mtime, touched on every hit) are removed first,
+# and the images of the other pipeline versions are removed whenever the directory is pruned.
+class ScaledImageCache:
+
+    SUBDIRECTORY = 'scaled_images'
+    # Version of the decoding pipeline (see decode_scaled()), increment it whenever the pixels it produces change
+    PIPELINE_VERSION = 2
+
+    # Cache directory. If not set, the user cache directory is used
+    directory = None
+    enabled = True
+    compress_level = 1
+    # Total size of the cached images, None for unlimited
+    max_bytes = 256 * 1024 * 1024
+    # Sources larger than reducing_gap times the target are shrunk by an integer factor before resampling (see Image.resize)
+    reducing_gap = 3.0
+
+    hits = 0
+    misses = 0
+    decodes = 0
+    decode_time = 0.0
+    peak_bytes = 0
+    removed = 0
+
+    # Directory pruned in this process and its size, updated on every saved image
+    __pruned_directory = None
+    __directory_bytes = 0
+
+    @staticmethod
+    def get_directory():
+        return ScaledImageCache.directory or os.path.join(get_cache_directory(), ScaledImageCache.SUBDIRECTORY)
+
+    # Returns the image from path resized to size with the resampling filter
+    @staticmethod
+    def get_scaled(path:str, size:tuple, resample=Image.LANCZOS) -> Image.Image:
+        if (not ScaledImageCache.enabled):
+            return ScaledImageCache.decode_scaled(path, size, resample)
+
+        _hash = FileHashCache.get_hash(path)
+        if (_hash is None):
+            # Cannot be keyed by the content, so it is not cached
+            return ScaledImageCache.decode_scaled(path, size, resample)
+
+        if (ScaledImageCache.__pruned_directory != ScaledImageCache.get_directory()):
+            # Once per process, so the images left by the other pipeline versions are removed even if nothing is saved
+            ScaledImageCache.prune()
+
+        _w, _h = size
+        _filename = "{hash}_{w}x{h}_{filter}_p{pipeline}_g{gap}.png".format(hash=_hash, w=_w, h=_h, filter=int(resample), pipeline=ScaledImageCache.PIPELINE_VERSION, gap=ScaledImageCache.reducing_gap)
+        cache_path = os.path.join(ScaledImageCache.get_directory(), _filename)
+        if (os.path.isfile(cache_path)):
+            try:
+                with Image.open(cache_path) as file:
+                    image = file.copy()
+            except OSError:
+                logger.warning("Cannot read scaled image, resizing again: {path}".format(path=cache_path), exc_info=True)
+            else:
+                ScaledImageCache.hits += 1
+                logger.debug("Scaled image loaded from cache: {path}".format(path=cache_path))
+                ScaledImageCache.__touch(cache_path)
+                return image
+
+        ScaledImageCache.misses += 1
+        image = ScaledImageCache.decode_scaled(path, size, resample)
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            _tmp_path = cache_path + '.tmp'
+            image.save(_tmp_path, format='PNG', compress_level=ScaledImageCache.compress_level)
+            os.replace(_tmp_path, cache_path)
+        except OSError:
+            logger.warning("Cannot save scaled image: {path}".format(path=cache_path), exc_info=True)
+        else:
+            ScaledImageCache.__on_saved(cache_path)
+
+        return image
+
+    @staticmethod
+    def __touch(path:str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def __on_saved(path:str):
+        try:
+            ScaledImageCache.__directory_bytes += os.path.getsize(path)
+        except OSError:
+            pass
+        if (ScaledImageCache.max_bytes is not None and ScaledImageCache.__directory_bytes > ScaledImageCache.max_bytes):
+            ScaledImageCache.prune()
+
+    # Removes the images of the other pipeline versions, then the least recently used ones until the directory fits max_bytes.
+    # Returns the number of the removed files.
+    @staticmethod
+    def prune() -> int:
+        _directory = ScaledImageCache.get_directory()
+        _suffix = '_p{pipeline}_'.format(pipeline=ScaledImageCache.PIPELINE_VERSION)
+        files = [ ]
+        stale = [ ]
+        for _path, _stat in ScaledImageCache.__list_files(_directory):
+            if (_suffix in os.path.basename(_path)):
+                files.append((_stat.st_mtime_ns, _stat.st_size, _path))
+            else:
+                stale.append(_path)
+
+        files.sort()
+        total = sum(_size for _, _size, _ in files)
+        removed = [ ]
+        for _mtime, _size, _path in files:
+            if (ScaledImageCache.max_bytes is None or total <= ScaledImageCache.max_bytes):
+                break
+            removed.append(_path)
+            total -= _size
+
+        count = ScaledImageCache.__remove_files(stale + removed)
+        ScaledImageCache.__pruned_directory = _directory
+        ScaledImageCache.__directory_bytes = total
+        if (count):
+            logger.info("Scaled image cache pruned: {count} files removed ({stale} of other pipeline versions), {total:.1f} MB left".format(count=count, stale=len(stale), total=total / 1024 / 1024))
+        return count
+
+    @staticmethod
+    def __list_files(directory:str):
+        try:
+            with os.scandir(directory) as entries:
+                return [ (entry.path, entry.stat()) for entry in entries if entry.is_file() and entry.name.endswith('.png') ]
+        except OSError:
+            return [ ]
+
+    @staticmethod
+    def __remove_files(paths) -> int:
+        count = 0
+        for _path in paths:
+            try:
+                os.remove(_path)
+            except OSError:
+                logger.warning("Cannot remove scaled image: {path}".format(path=_path), exc_info=True)
+            else:
+                count += 1
+
+        ScaledImageCache.removed += count
+        return count
+
+    # Decodes the image only at the resolution needed for the size (JPEG DCT scaling, reduce() for the others) and resizes it.
+    # Logs the decode time and the peak memory of the pixel buffers.
+    @staticmethod
+    def decode_scaled(path:str, size:tuple, resample=Image.LANCZOS) -> Image.Image:
+        _start = time.perf_counter()
+        with Image.open(path) as image:
+            _source_width, _source_height = image.size
+            _bands = len(image.getbands())
+            if (image.format == 'JPEG'):
+                # Decodes at 1/2, 1/4 or 1/8 of the resolution, but not below the target size
+                image.draft(image.mode, size)
+
+            image.load()
+            _decoded_bytes = image.width * image.height * _bands
+            _decoded_size = image.size
+            result = image.resize(size, resample, reducing_gap=ScaledImageCache.reducing_gap)
+
+        _time = time.perf_counter() - _start
+        _peak_bytes = _decoded_bytes + result.width * result.height * len(result.getbands())
+        ScaledImageCache.decodes += 1
+        ScaledImageCache.decode_time += _time
+        ScaledImageCache.peak_bytes = max(ScaledImageCache.peak_bytes, _peak_bytes)
+
+        logger.info("Image decoded in {time:.3f}s: {path} ({sw}x{sh}, decoded at {dw}x{dh}, scaled to {w}x{h}), peak memory {peak:.1f} MB instead of {full:.1f} MB".format \
+        (
+            time = _time,
+            path = path,
+            sw = _source_width, sh = _source_height,
+            dw = _decoded_size[0], dh = _decoded_size[1],
+            w = size[0], h = size[1],
+            peak = _peak_bytes / 1024 / 1024,
+            full = (_source_width * _source_height * _bands + result.width * result.height * len(result.getbands())) / 1024 / 1024,
+        ))
+
+        return result
+
+    @staticmethod
+    def get_stats():
+        result_dict = \
+        {
+            'hits': ScaledImageCache.hits,
+            'misses': ScaledImageCache.misses,
+            'decodes': ScaledImageCache.decodes,
+            'decode_time': ScaledImageCache.decode_time,
+            'peak_bytes': ScaledImageCache.peak_bytes,
+            'removed': ScaledImageCache.removed,
+        }
+
+        return result_dict
+
+    # Resets the stats. If files is set, removes all the scaled images from the disk too and returns the number of them.
+    @staticmethod
+    def clear(files:bool=False) -> int:
+        logger.debug("Clearing scaled image cache: {stats}".format(stats=ScaledImageCache.get_stats()))
+        count = 0
+        if (files):
+            count = ScaledImageCache.__remove_files(_path for _path, _ in ScaledImageCache.__list_files(ScaledImageCache.get_directory()))
+            ScaledImageCache.__directory_bytes = 0
+            logger.info("Scaled image cache cleared: {count} files removed".format(count=count))
+
+        ScaledImageCache.hits = 0
+        ScaledImageCache.misses = 0
+        ScaledImageCache.decodes = 0
+        ScaledImageCache.decode_time = 0.0
+        ScaledImageCache.peak_bytes = 0
+        ScaledImageCache.removed = 0
+        return count
@@ -0,0 +1,36 @@
+import os
+from PIL import Image
+from hammerhal.lru_cache import LruCache
+from logging import getLogger
+logger = getLogger('hammerhal.compilers.template_cache')
+
+
+# Process-wide cache of the decoded card templates, keyed by the file path.
+# Each template is decoded once (and again if the file is modified), the callers get their own copies to draw on.
+# Least recently used templates are evicted when the cache grows over 256 MB. Thread-safe.
+class TemplateCache:
+
+    # { path: (mtime, image) }
+    __templates = LruCache('Template', max_bytes=256 * 1024 * 1024, get_bytes=lambda cached: cached[1].width * cached[1].height * len(cached[1].getbands()))
+
+    # Returns a new copy of the template, which could be modified freely
+    @staticmethod
+    def get_template(path:str) -> Image.Image:
+        _mtime = os.stat(path).st_mtime_ns
+        _, image = TemplateCache.__templates.get(path, lambda: (_mtime, TemplateCache.__decode(path)), is_valid=lambda cached: cached[0] == _mtime)
+        return image.copy()
+
+    @staticmethod
+    def __decode(path:str):
+        logger.debug("Decoding template {path}".format(path=path))
+        with Image.open(path) as file:
+            return file.copy()
+
+    @staticmethod
+    def get_stats():
+        return TemplateCache.__templates.get_stats()
+
+    @staticmethod
+    def clear():
+        logger.debug("Clearing template cache: {stats}".format(stats=TemplateCache.get_stats()))
+        TemplateCache.__templates.clear()
@@ -11,13 +11,28 @@ class ConfigLoader:
     __main_config_key = 'main'
     __main_config_path = 'configs/hammerhal.json'
 
+    # Incremented on every (re)load of any config, so the cached lookups made before are known to be stale
+    generation = 0
+    __lookups = {}
+    __compiled_paths = {}
+
     @staticmethod
     def __find_element_in_dict_object(dict_object:dict, key_path:str):
+        keys = ConfigLoader.__compiled_paths.get(key_path, None)
+        if (keys is None):
+            keys = tuple(key_path.split('/'))
+            ConfigLoader.__compiled_paths[key_path] = keys
+
         try:
-            return reduce(lambda d, key: d[key], key_path.split('/'), dict_object)
+            return reduce(lambda d, key: d[key], keys, dict_object)
         except KeyError:
             return None
 
+    @staticmethod
+    def __invalidate():
+        ConfigLoader.generation += 1
+        ConfigLoader.__lookups.clear()
+
     # @staticmethod
     # def __load_config(config_path, config_key, logging_enabled):
 
@@ -42,6 +57,7 @@ class ConfigLoader:
         logger.debug(json.dumps(main_config, indent=4, sort_keys=True))
         ConfigLoader.__active_configs[ConfigLoader.__main_config_key] = main_config
         ConfigLoader.__config_locations[ConfigLoader.__main_config_key] = ConfigLoader.__main_config_path
+        ConfigLoader.__invalidate()
         logger.debug("Main config loaded successfully")
 
     @staticmethod
@@ -56,6 +72,7 @@ class ConfigLoader:
             logger.debug(json.dumps(config, indent=4, sort_keys=True))
             ConfigLoader.__active_configs[key] = config
             ConfigLoader.__config_locations[key] = path
+            ConfigLoader.__invalidate()
             logger.debug("Config '{key}' loaded successfully".format(key=key))
             return True
 
@@ -69,6 +86,7 @@ class ConfigLoader:
             old_config = ConfigLoader.__active_configs[config_name]
             if (not ConfigLoader.__load_config(config_name, ConfigLoader.__config_locations[config_name])):
                 ConfigLoader.__active_configs[config_name] = old_config
+                ConfigLoader.__invalidate()
                 return False
             else:
                 return True
@@ -88,6 +106,12 @@ class ConfigLoader:
 
     @staticmethod
     def get_from_config(path: str, config_name: str='main'):
+        key = (config_name, path)
+        if (key in ConfigLoader.__lookups):
+            return ConfigLoader.__lookups[key]
+
+        result = None
         if (config_name in ConfigLoader.__active_configs):
-            return ConfigLoader.__find_element_in_dict_object(ConfigLoader.__active_configs[config_name], path)
-        return None
+            result = ConfigLoader.__find_element_in_dict_object(ConfigLoader.__active_configs[config_name], path)
+        ConfigLoader.__lookups[key] = result
+        return result
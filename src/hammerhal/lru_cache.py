@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+from logging import getLogger
+logger = getLogger('hammerhal.lru_cache')
+
+
+# Thread-safe least recently used cache, bounded by the number of values (max_size) and/or their total size in bytes (max_bytes).
+# Values are created under the lock by the callback given to get(), so each of them is created only once.
+# The most recently added value is never evicted, even if it is larger than max_bytes alone.
+class LruCache:
+
+    name = None
+    max_size = None
+    max_bytes = None
+
+    hits = 0
+    misses = 0
+    evictions = 0
+
+    # get_bytes: returns the size of the value, required with max_bytes; on_evict: called with (key, value) of the evicted or removed values
+    def __init__(self, name:str, max_size:int=None, max_bytes:int=None, get_bytes=None, on_evict=None):
+        self.name = name
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.__get_bytes = get_bytes or (lambda value: 0)
+        self.__on_evict = on_evict
+        self.__values = OrderedDict()
+        self.__bytes = 0
+        self.lock = threading.RLock()
+
+    # Returns the cached value of the key. If there is none, or is_valid(value) is False, stores and returns the one created by create()
+    def get(self, key, create, is_valid=None):
+        with self.lock:
+            value = self.__values.get(key, None)
+            if (value is not None):
+                if (is_valid is None or is_valid(value)):
+                    self.hits += 1
+                    self.__values.move_to_end(key)
+                    return value
+
+                logger.debug("{name} is outdated, creating it again: {key}".format(name=self.name, key=key))
+                self.__remove(key)
+
+            self.misses += 1
+            value = create()
+            self.__values[key] = value
+            self.__bytes += self.__get_bytes(value)
+            while (len(self.__values) > 1 and ((self.max_size is not None and len(self.__values) > self.max_size) or (self.max_bytes is not None and self.__bytes > self.max_bytes))):
+                _key = next(iter(self.__values))
+                self.__remove(_key)
+                self.evictions += 1
+                logger.debug("{name} evicted from cache: {key}".format(name=self.name, key=_key))
+
+            return value
+
+    def __remove(self, key):
+        value = self.__values.pop(key)
+        self.__bytes -= self.__get_bytes(value)
+        if (self.__on_evict):
+            self.__on_evict(key, value)
+
+    def keys(self):
+        with self.lock:
+            return list(self.__values)
+
+    def __len__(self):
+        return len(self.__values)
+
+    def get_stats(self):
+        result_dict = \
+        {
+            'size': len(self.__values),
+            'bytes': self.__bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+        return result_dict
+
+    def clear(self):
+        with self.lock:
+            self.__values.clear()
+            self.__bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
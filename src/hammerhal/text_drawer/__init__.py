@@ -1,2 +1,9 @@
-from hammerhal.text_drawer.font_finder import *
+from hammerhal.text_drawer.font_index import *
+from hammerhal.text_drawer.font_finder import *
+from hammerhal.text_drawer.font_cache import *
+from hammerhal.text_drawer.font_metrics import *
+from hammerhal.text_drawer.glyph_metrics_cache import *
+from hammerhal.text_drawer.sprite_cache import *
+from hammerhal.text_drawer.markup import *
+from hammerhal.text_drawer.text_layout import *
 from hammerhal.text_drawer.text_drawer import *
\ No newline at end of file
@@ -0,0 +1,62 @@
+import os
+from io import BytesIO
+from PIL import ImageFont
+from hammerhal.lru_cache import LruCache
+from logging import getLogger
+logger = getLogger('hammerhal.text_drawer.font_cache')
+
+
+# Process-wide cache of FreeType font instances, keyed by (path, size, encoding).
+# Font files are read from the disk once and shared by all instances of the same file.
+# Least recently used instances are evicted when there are more than 64 of them. Thread-safe.
+class FontCache:
+
+    __fonts = LruCache('Font', max_size=64, on_evict=lambda key, font: FontCache.__on_evict(key, font))
+    # { path: font file content }, guarded by the lock of the fonts cache
+    __font_files = {}
+
+    @staticmethod
+    def get_font(path:str, size:int, encoding:str='unic') -> ImageFont.FreeTypeFont:
+        return FontCache.__fonts.get((path, size, encoding), lambda: FontCache.__load_font(path, size, encoding))
+
+    @staticmethod
+    def __load_font(path:str, size:int, encoding:str):
+        font_file = FontCache.__get_font_file(path)
+        if (font_file is None):
+            # Not a real path (i.e. 'times.ttf'), let Pillow search for it
+            return ImageFont.truetype(font=path, size=size, encoding=encoding)
+        else:
+            return ImageFont.truetype(font=BytesIO(font_file), size=size, encoding=encoding)
+
+    @staticmethod
+    def __get_font_file(path:str):
+        font_file = FontCache.__font_files.get(path, None)
+        if (font_file is None and os.path.isfile(path)):
+            logger.debug("Loading font file {path}".format(path=path))
+            with open(path, 'rb') as file:
+                font_file = file.read()
+            FontCache.__font_files[path] = font_file
+
+        return font_file
+
+    @staticmethod
+    def __on_evict(key, font):
+        path, _, _ = key
+        if not (any(_path == path for _path, _, _ in FontCache.__fonts.keys())):
+            FontCache.__font_files.pop(path, None)
+
+    @staticmethod
+    def get_stats():
+        with FontCache.__fonts.lock:
+            result_dict = FontCache.__fonts.get_stats()
+            result_dict['files'] = len(FontCache.__font_files)
+            result_dict['bytes'] = sum(len(_font_file) for _font_file in FontCache.__font_files.values())
+
+        return result_dict
+
+    @staticmethod
+    def clear():
+        logger.debug("Clearing font cache: {stats}".format(stats=FontCache.get_stats()))
+        with FontCache.__fonts.lock:
+            FontCache.__fonts.clear()
+            FontCache.__font_files.clear()
@@ -0,0 +1,197 @@
+import os, json
+from concurrent.futures import ProcessPoolExecutor
+from fontTools import ttLib
+from logging import getLogger
+logger = getLogger('hammerhal.text_drawer.font_index')
+
+
+# Persistent index of the installed fonts: family, full name, style flags, path, mtime and size of every font file.
+# Stored as JSON in the cache directory and refreshed incrementally: only new or modified files are opened.
+# Files which could not be parsed are remembered too, so they are not reopened on every run.
+class FontIndex:
+
+    VERSION = 1
+
+    # Cold scans with at least this many files to parse are spread across processes
+    parallel_threshold = 32
+    max_workers = None
+
+    path = None
+    fonts = None
+    __modified = False
+    __families = None
+    __filenames = None
+    __lower_filenames = None
+
+    def __init__(self, path:str):
+        self.path = path
+        self.fonts = {}
+        self.__load()
+        self.__build_lookups()
+
+    def __load(self):
+        if (not self.path or not os.path.isfile(self.path)):
+            return
+
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            logger.warning("Font index is corrupted and will be rebuilt: {path}".format(path=self.path), exc_info=True)
+            return
+
+        if (data.get('version', None) != FontIndex.VERSION):
+            logger.info("Font index format changed, rebuilding it")
+            return
+
+        self.fonts = data.get('fonts', {})
+        logger.debug("Font index loaded: {n} files".format(n=len(self.fonts)))
+
+    def save(self):
+        if (not self.path or not self.__modified):
+            return
+
+        data = \
+        {
+            'version': FontIndex.VERSION,
+            'fonts': self.fonts,
+        }
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            _tmp_path = self.path + '.tmp'
+            with open(_tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(data, file)
+            os.replace(_tmp_path, self.path)
+        except OSError:
+            logger.warning("Cannot save font index: {path}".format(path=self.path), exc_info=True)
+        else:
+            self.__modified = False
+            logger.debug("Font index saved: {path}".format(path=self.path))
+
+    # Brings the index up to date with the font directories and saves it if anything changed
+    def refresh(self, directories):
+        found = {}
+        for font_dir in directories:
+            for _root, _, _files in os.walk(font_dir):
+                for _file in _files:
+                    _path = os.path.join(_root, _file)
+                    try:
+                        _stat = os.stat(_path)
+                    except OSError:
+                        continue
+                    found[_path] = (_stat.st_mtime_ns, _stat.st_size)
+
+        removed = [ _path for _path in self.fonts if not _path in found ]
+        for _path in removed:
+            del self.fonts[_path]
+
+        changed = [ _path for _path, (_mtime, _size) in found.items() if not FontIndex.__is_actual(self.fonts.get(_path, None), _mtime, _size) ]
+        for _path, entry in zip(changed, self.__read_entries(changed)):
+            _mtime, _size = found[_path]
+            entry['mtime'] = _mtime
+            entry['size'] = _size
+            self.fonts[_path] = entry
+
+        if (removed or changed):
+            self.__build_lookups()
+            logger.info("Font index refreshed: {new} files parsed, {removed} removed, {total} indexed".format(new=len(changed), removed=len(removed), total=len(self.fonts)))
+            self.__modified = True
+            self.save()
+
+    @staticmethod
+    def __is_actual(entry, mtime, size):
+        return entry is not None and entry.get('mtime', None) == mtime and entry.get('size', None) == size
+
+    def __read_entries(self, paths):
+        if (len(paths) >= FontIndex.parallel_threshold):
+            try:
+                with ProcessPoolExecutor(max_workers=FontIndex.max_workers) as executor:
+                    return list(executor.map(FontIndex.read_font_entry, paths, chunksize=16))
+            except (OSError, RuntimeError):
+                logger.warning("Cannot scan fonts in parallel, falling back to the sequential scan", exc_info=True)
+
+        return [ FontIndex.read_font_entry(_path) for _path in paths ]
+
+    # Public, so it could be sent to the worker processes
+    @staticmethod
+    def read_font_entry(path:str) -> dict:
+        try:
+            font = ttLib.TTFont(path, lazy=True)
+            name = font['name'].getDebugName(4)
+            family = font['name'].getDebugName(1)
+        except Exception:
+            return { }
+
+        if (not name or not family):
+            return { }
+
+        lower_name = name.lower()
+        if ('OS/2' in font):
+            _os2 = font['OS/2']
+            bold = bool(_os2.fsSelection & 0x20)
+            italic = bool(_os2.fsSelection & 0x01)
+            weight = _os2.usWeightClass
+        else:
+            bold = 'bold' in lower_name
+            italic = 'italic' in lower_name
+            weight = 700 if bold else 400
+
+        result = \
+        {
+            'family': family,
+            'name': name,
+            'bold': bold,
+            'italic': italic,
+            'weight': weight,
+        }
+
+        return result
+
+    # Lookups are replaced only when they are complete, so find() could be called while the index is refreshed
+    def __build_lookups(self):
+        _families = {}
+        _filenames = {}
+        _lower_filenames = {}
+        for _path in sorted(self.fonts):
+            entry = self.fonts[_path]
+            if ('family' in entry):
+                _families.setdefault(entry['family'], []).append((_path, entry))
+
+            _filename = os.path.basename(_path)
+            _filenames.setdefault(_filename, _path)
+            _lower_filenames.setdefault(_filename.lower(), _path)
+
+        self.__families, self.__filenames, self.__lower_filenames = _families, _filenames, _lower_filenames
+
+    # Returns the path of the best font of the family with the requested style, or None
+    def find(self, family_name:str, bold:bool=False, italic:bool=False):
+        _weight = 700 if bold else 400
+        _family = self.__families.get(family_name, ())
+        candidates = [ (abs(entry['weight'] - _weight), FontIndex.__name_mismatch(entry['name'], bold, italic), _path) for _path, entry in _family if entry['bold'] == bold and entry['italic'] == italic ]
+        if (not candidates):
+            # Fall back to the full name if none of the fonts has the matching style flags
+            candidates = [ (0, 0, _path) for _path, entry in _family if not FontIndex.__name_mismatch(entry['name'], bold, italic) ]
+        if (not candidates):
+            return None
+
+        return min(candidates)[-1]
+
+    # Style flags of some fonts are not set properly, so the full name is checked too
+    @staticmethod
+    def __name_mismatch(name:str, bold:bool, italic:bool):
+        lower_name = name.lower()
+        return (('bold' in lower_name) != bold) + (('italic' in lower_name) != italic)
+
+    # Exact file name matches are preferred over the case-insensitive ones
+    def find_by_filename(self, filename:str):
+        return self.__filenames.get(filename, None) or self.__lower_filenames.get(filename.lower(), None)
+
+    # Returns { family: { lower full name: path } }
+    def get_families(self):
+        result_dict = {}
+        for _path, entry in self.fonts.items():
+            if ('family' in entry):
+                result_dict.setdefault(entry['family'], {})[entry['name'].lower()] = _path
+
+        return result_dict
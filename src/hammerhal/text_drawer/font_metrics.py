@@ -0,0 +1,315 @@
+import os, threading
+import numpy
+from PIL import features
+from fontTools.ttLib import TTFont
+from logging import getLogger
+logger = getLogger('hammerhal.text_drawer.font_metrics')
+
+
+# Text metrics of a single font file, read from its cmap, hmtx, glyf and kern/GPOS tables once.
+# Sizes of any string are then computed arithmetically over its code points, without rasterizing anything.
+# Widths follow FreeType scaling and the layout engine Pillow draws with. Heights come from unhinted glyph bounds, so they could differ from the rasterized ones by a pixel.
+class FontMetrics:
+
+    # Code points above this are looked up by the dict instead of the array
+    CMAP_ARRAY_SIZE = 0x10000
+    # Kerning of the smaller sizes is scaled down by FreeType
+    KERNING_SMALL_PPEM = 25
+
+    path = None
+    units_per_em = None
+    ascent = None
+    descent = None
+    basic_layout = None
+
+    __cmap = None
+    __cmap_extra = None
+    __advances = None
+    __y_min = None
+    __glyph_bounds = None
+    __bounds_lock = None
+    __kern_pairs = None
+    __kern_lookups = None
+
+    def __init__(self, path:str, basic_layout:bool=True):
+        self.path = path
+        self.basic_layout = basic_layout
+
+        font = TTFont(path, lazy=True)
+        self.units_per_em = font['head'].unitsPerEm
+        self.ascent = font['hhea'].ascent
+        self.descent = font['hhea'].descent
+        if (not self.ascent and not self.descent and 'OS/2' in font):
+            self.ascent = font['OS/2'].sTypoAscender
+            self.descent = font['OS/2'].sTypoDescender
+
+        glyph_order = font.getGlyphOrder()
+        glyph_ids = { name: i for i, name in enumerate(glyph_order) }
+
+        self.__cmap = numpy.zeros(FontMetrics.CMAP_ARRAY_SIZE, dtype=numpy.int32)
+        self.__cmap_extra = {}
+        for code, name in (font.getBestCmap() or {}).items():
+            if (code < FontMetrics.CMAP_ARRAY_SIZE):
+                self.__cmap[code] = glyph_ids[name]
+            else:
+                self.__cmap_extra[code] = glyph_ids[name]
+
+        hmtx = font['hmtx'].metrics
+        self.__advances = numpy.array([ hmtx[name][0] for name in glyph_order ], dtype=numpy.int64)
+
+        # Bounds are read lazily, decompiling all the glyphs of the font is slow
+        self.__y_min = numpy.full(len(glyph_order), numpy.nan)
+        self.__glyph_bounds = FontMetrics.__get_bounds_reader(font, glyph_order)
+        # The lazy font is not thread-safe, glyphs are decompiled by one thread at a time
+        self.__bounds_lock = threading.Lock()
+
+        if (self.basic_layout or not 'GPOS' in font):
+            self.__kern_pairs = FontMetrics.__read_kern_table(font)
+        else:
+            self.__kern_lookups = FontMetrics.__read_gpos_kerning(font, glyph_ids)
+
+    # Returns (width, height) of the single line of text, in pixels
+    def get_text_size(self, text:str, size:int):
+        if (not text):
+            return 0, 0
+
+        glyphs = self.get_glyph_ids(text)
+        x_scale = y_scale = FontMetrics.__div_fix(size * 64, self.units_per_em)
+
+        advances = FontMetrics.__mul_fix(self.__advances[glyphs], x_scale)
+        if (self.basic_layout):
+            # Hinted advances are rounded to the whole pixels
+            advances = FontMetrics.__pix_round(advances)
+        width = int(advances.sum())
+
+        if (len(glyphs) > 1):
+            kerning = FontMetrics.__mul_fix(self.__get_kerning(glyphs[:-1], glyphs[1:]), x_scale)
+            if (self.basic_layout):
+                # FreeType scales the kerning down below 25 ppem, before it is rounded to the whole pixels (see FT_Get_Kerning)
+                if (size < FontMetrics.KERNING_SMALL_PPEM):
+                    kerning = FontMetrics.__mul_div(kerning, size, FontMetrics.KERNING_SMALL_PPEM)
+                # Pillow's basic layout adds the kerning in whole pixels to the 26.6 advance, so it is 64 times weaker
+                width += int(FontMetrics.__pix_round(kerning).sum() // 64)
+            else:
+                width += int(kerning.sum())
+
+        y_min = min(self.__get_y_min(glyphs).min(), 0)
+        height = self.get_ascender(size) - int(FontMetrics.__pix_round(FontMetrics.__mul_fix(numpy.array([ int(y_min) ]), y_scale))[0] // 64)
+
+        return width / 64, height
+
+    def get_ascender(self, size:int) -> int:
+        y_scale = FontMetrics.__div_fix(size * 64, self.units_per_em)
+        return int(FontMetrics.__pix_ceil(FontMetrics.__mul_fix(numpy.array([ self.ascent ]), y_scale))[0] // 64)
+
+    def get_glyph_ids(self, text:str) -> numpy.ndarray:
+        codes = numpy.frombuffer(text.encode('utf-32-le'), dtype=numpy.uint32)
+        extra = codes >= FontMetrics.CMAP_ARRAY_SIZE
+        if (not extra.any()):
+            return self.__cmap[codes]
+
+        glyphs = self.__cmap[numpy.where(extra, 0, codes)]
+        glyphs[extra] = [ self.__cmap_extra.get(int(code), 0) for code in codes[extra] ]
+        return glyphs
+
+    def __get_y_min(self, glyphs:numpy.ndarray) -> numpy.ndarray:
+        result = self.__y_min[glyphs]
+        missing = numpy.isnan(result)
+        if (missing.any()):
+            with self.__bounds_lock:
+                for glyph in numpy.unique(glyphs[missing]):
+                    if (numpy.isnan(self.__y_min[glyph])):
+                        self.__y_min[glyph] = self.__glyph_bounds(int(glyph))
+            result = self.__y_min[glyphs]
+
+        return result
+
+    def __get_kerning(self, left:numpy.ndarray, right:numpy.ndarray) -> numpy.ndarray:
+        if (self.__kern_pairs):
+            return FontMetrics.__lookup_pairs(self.__kern_pairs, left, right)[0]
+
+        result = numpy.zeros(len(left), dtype=numpy.int64)
+        for subtables in (self.__kern_lookups or ()):
+            # Within the lookup, only the first subtable covering the pair is applied
+            remaining = numpy.ones(len(left), dtype=bool)
+            for subtable in subtables:
+                if (subtable[0] == 'pairs'):
+                    values, matched = FontMetrics.__lookup_pairs(subtable[1], left, right)
+                else:
+                    _, coverage, class_def_1, class_def_2, matrix = subtable
+                    matched = coverage[left]
+                    values = matrix[class_def_1[left], class_def_2[right]]
+
+                matched &= remaining
+                result[matched] += values[matched]
+                remaining &= ~matched
+
+        return result
+
+    @staticmethod
+    def __lookup_pairs(pairs, left:numpy.ndarray, right:numpy.ndarray):
+        keys, values = pairs
+        _keys = (left.astype(numpy.int64) << 32) | right.astype(numpy.int64)
+        index = numpy.minimum(numpy.searchsorted(keys, _keys), len(keys) - 1)
+        matched = keys[index] == _keys
+        return numpy.where(matched, values[index], 0), matched
+
+    @staticmethod
+    def __make_pairs(pairs:dict):
+        if (not pairs):
+            return None
+
+        keys = numpy.array([ (left << 32) | right for left, right in pairs ], dtype=numpy.int64)
+        values = numpy.array(list(pairs.values()), dtype=numpy.int64)
+        order = numpy.argsort(keys)
+        return keys[order], values[order]
+
+    @staticmethod
+    def __read_kern_table(font:TTFont):
+        if (not 'kern' in font):
+            return None
+
+        pairs = {}
+        for subtable in font['kern'].kernTables:
+            if (getattr(subtable, 'format', None) != 0 or not hasattr(subtable, 'kernTable')):
+                continue
+
+            for (left, right), value in subtable.kernTable.items():
+                pairs[(font.getGlyphID(left), font.getGlyphID(right))] = value
+
+        return FontMetrics.__make_pairs(pairs)
+
+    @staticmethod
+    def __read_gpos_kerning(font:TTFont, glyph_ids:dict):
+        gpos = font['GPOS'].table
+        if (not gpos.FeatureList or not gpos.LookupList):
+            return None
+
+        lookup_indices = sorted({ index for record in gpos.FeatureList.FeatureRecord if record.FeatureTag == 'kern' for index in record.Feature.LookupListIndex })
+        num_glyphs = len(glyph_ids)
+        lookups = []
+        for lookup_index in lookup_indices:
+            lookup = gpos.LookupList.Lookup[lookup_index]
+            subtables = []
+            for subtable in lookup.SubTable:
+                if (lookup.LookupType == 9):
+                    subtable = subtable.ExtSubTable
+                if (getattr(subtable, 'LookupType', lookup.LookupType) != 2):
+                    continue
+
+                if (subtable.Format == 1):
+                    pairs = {}
+                    for left, pair_set in zip(subtable.Coverage.glyphs, subtable.PairSet):
+                        for record in pair_set.PairValueRecord:
+                            pairs[(glyph_ids[left], glyph_ids[record.SecondGlyph])] = getattr(record.Value1, 'XAdvance', 0) or 0
+                    _pairs = FontMetrics.__make_pairs(pairs)
+                    if (_pairs):
+                        subtables.append(('pairs', _pairs))
+                elif (subtable.Format == 2):
+                    coverage = numpy.zeros(num_glyphs, dtype=bool)
+                    coverage[[ glyph_ids[name] for name in subtable.Coverage.glyphs ]] = True
+                    class_def_1 = numpy.zeros(num_glyphs, dtype=numpy.int32)
+                    for name, cls in subtable.ClassDef1.classDefs.items():
+                        class_def_1[glyph_ids[name]] = cls
+                    class_def_2 = numpy.zeros(num_glyphs, dtype=numpy.int32)
+                    for name, cls in subtable.ClassDef2.classDefs.items():
+                        class_def_2[glyph_ids[name]] = cls
+                    matrix = numpy.array([ [ getattr(record.Value1, 'XAdvance', 0) or 0 for record in class_1.Class2Record ] for class_1 in subtable.Class1Record ], dtype=numpy.int64)
+                    subtables.append(('classes', coverage, class_def_1, class_def_2, matrix))
+
+            if (subtables):
+                lookups.append(subtables)
+
+        return lookups
+
+    @staticmethod
+    def __get_bounds_reader(font:TTFont, glyph_order):
+        if ('glyf' in font):
+            glyf = font['glyf']
+            def reader(glyph:int):
+                _glyph = glyf[glyph_order[glyph]]
+                if (not _glyph.numberOfContours):
+                    return 0
+                return _glyph.yMin
+        else:
+            glyph_set = font.getGlyphSet()
+            from fontTools.pens.boundsPen import BoundsPen
+            def reader(glyph:int):
+                pen = BoundsPen(glyph_set)
+                glyph_set[glyph_order[glyph]].draw(pen)
+                return pen.bounds[1] if (pen.bounds) else 0
+
+        return reader
+
+    # FreeType fixed point arithmetic, so the scaled values match the ones it renders with
+    @staticmethod
+    def __div_fix(a:int, b:int) -> int:
+        return ((a << 16) + (b >> 1)) // b
+    @staticmethod
+    def __mul_fix(a:numpy.ndarray, b:int) -> numpy.ndarray:
+        a = numpy.asarray(a, dtype=numpy.int64)
+        return numpy.sign(a) * ((numpy.abs(a) * b + 0x8000) >> 16)
+    @staticmethod
+    def __mul_div(a:numpy.ndarray, b:int, c:int) -> numpy.ndarray:
+        a = numpy.asarray(a, dtype=numpy.int64)
+        return numpy.sign(a) * ((numpy.abs(a) * b + (c >> 1)) // c)
+    @staticmethod
+    def __pix_round(a:numpy.ndarray) -> numpy.ndarray:
+        return (a + 32) & -64
+    @staticmethod
+    def __pix_ceil(a:numpy.ndarray) -> numpy.ndarray:
+        return (a + 63) & -64
+
+
+# Process-wide registry of FontMetrics, so every font file is parsed only once.
+class FontMetricsCache:
+
+    __metrics = {}
+    __lock = threading.RLock()
+    # Pillow draws with the basic layout engine unless it is built with raqm
+    __basic_layout = None
+
+    hits = 0
+    misses = 0
+
+    # Returns FontMetrics of the font file, or None if it could not be read (i.e. it is not a real path)
+    @staticmethod
+    def get_metrics(path:str):
+        with FontMetricsCache.__lock:
+            if (path in FontMetricsCache.__metrics):
+                FontMetricsCache.hits += 1
+                return FontMetricsCache.__metrics[path]
+
+            FontMetricsCache.misses += 1
+            if (FontMetricsCache.__basic_layout is None):
+                FontMetricsCache.__basic_layout = not features.check('raqm')
+
+            metrics = None
+            if (os.path.isfile(path)):
+                try:
+                    metrics = FontMetrics(path, basic_layout=FontMetricsCache.__basic_layout)
+                    logger.debug("Font metrics loaded: {path}".format(path=path))
+                except Exception as e:
+                    logger.warning("Could not read font metrics of {path}: {e}".format(path=path, e=e))
+            FontMetricsCache.__metrics[path] = metrics
+
+            return metrics
+
+    @staticmethod
+    def get_stats():
+        result_dict = \
+        {
+            'size': len(FontMetricsCache.__metrics),
+            'hits': FontMetricsCache.hits,
+            'misses': FontMetricsCache.misses,
+        }
+
+        return result_dict
+
+    @staticmethod
+    def clear():
+        logger.debug("Clearing font metrics cache: {stats}".format(stats=FontMetricsCache.get_stats()))
+        with FontMetricsCache.__lock:
+            FontMetricsCache.__metrics.clear()
+            FontMetricsCache.hits = 0
+            FontMetricsCache.misses = 0
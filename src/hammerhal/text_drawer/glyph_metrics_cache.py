@@ -0,0 +1,83 @@
+from PIL import ImageDraw, ImageFont
+from hammerhal.text_drawer import FontMetricsCache
+from logging import getLogger
+logger = getLogger('hammerhal.text_drawer.glyph_metrics_cache')
+
+
+# Process-wide cache of glyph and run sizes, shared by all TextDrawer instances.
+# Keyed by (font file, font size, style, text), so every glyph or run is measured by FreeType only once.
+class GlyphMetricsCache:
+
+    __metrics = {}
+    __run_metrics = {}
+    __analytic_metrics = {}
+
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def get_char_size(drawer:ImageDraw.ImageDraw, font:ImageFont.FreeTypeFont, font_path:str, font_size:int, style, char:str):
+        key = (font_path, font_size, style, char)
+        result = GlyphMetricsCache.__metrics.get(key, None)
+        if (result is None):
+            GlyphMetricsCache.misses += 1
+            result = drawer.textsize(char, font=font)
+            GlyphMetricsCache.__metrics[key] = result
+        else:
+            GlyphMetricsCache.hits += 1
+
+        return result
+
+    # Runs are measured by their real advance (including kerning) instead of the bounding box
+    @staticmethod
+    def get_run_size(drawer:ImageDraw.ImageDraw, font:ImageFont.FreeTypeFont, font_path:str, font_size:int, style, run:str):
+        key = (font_path, font_size, style, run)
+        result = GlyphMetricsCache.__run_metrics.get(key, None)
+        if (result is None):
+            GlyphMetricsCache.misses += 1
+            _, _height = drawer.textsize(run, font=font)
+            result = (font.getlength(run), _height)
+            GlyphMetricsCache.__run_metrics[key] = result
+        else:
+            GlyphMetricsCache.hits += 1
+
+        return result
+
+    # Same as get_run_size(), but computed from the font tables by FontMetrics, without Pillow.
+    # Falls back to get_run_size() if the font file could not be read.
+    @staticmethod
+    def get_analytic_size(drawer:ImageDraw.ImageDraw, font:ImageFont.FreeTypeFont, font_path:str, font_size:int, style, text:str):
+        key = (font_path, font_size, style, text)
+        result = GlyphMetricsCache.__analytic_metrics.get(key, None)
+        if (result is None):
+            metrics = FontMetricsCache.get_metrics(font_path)
+            if (metrics is None):
+                return GlyphMetricsCache.get_run_size(drawer, font, font_path, font_size, style, text)
+
+            GlyphMetricsCache.misses += 1
+            result = metrics.get_text_size(text, font_size)
+            GlyphMetricsCache.__analytic_metrics[key] = result
+        else:
+            GlyphMetricsCache.hits += 1
+
+        return result
+
+    @staticmethod
+    def get_stats():
+        result_dict = \
+        {
+            'size': len(GlyphMetricsCache.__metrics) + len(GlyphMetricsCache.__run_metrics) + len(GlyphMetricsCache.__analytic_metrics),
+            'hits': GlyphMetricsCache.hits,
+            'misses': GlyphMetricsCache.misses,
+        }
+
+        return result_dict
+
+    @staticmethod
+    def clear():
+        logger.debug("Clearing glyph metrics cache: {stats}".format(stats=GlyphMetricsCache.get_stats()))
+        GlyphMetricsCache.__metrics.clear()
+        GlyphMetricsCache.__run_metrics.clear()
+        GlyphMetricsCache.__analytic_metrics.clear()
+        GlyphMetricsCache.hits = 0
+        GlyphMetricsCache.misses = 0
@@ -0,0 +1,111 @@
+from hammerhal.lru_cache import LruCache
+from logging import getLogger
+logger = getLogger('hammerhal.text_drawer.markup')
+
+
+# Part of the word printed with the same style.
+# Bold and italic are toggles relative to the font of the TextDrawer, not the absolute style.
+class StyledRun:
+    __slots__ = ('text', 'bold', 'italic')
+
+    def __init__(self, text:str, bold:bool, italic:bool):
+        self.text = text
+        self.bold = bold
+        self.italic = italic
+
+class MarkupWord:
+    __slots__ = ('text', 'runs')
+
+    def __init__(self, text:str, runs):
+        self.text = text
+        self.runs = runs
+
+class AlignmentDirective:
+    __slots__ = ('operand',)
+
+    def __init__(self, operand:str):
+        self.operand = operand
+
+# Turns the text with inline markup (**bold**, __italic__, $$HA_* alignment operands) into the token stream.
+# Results are memoized by the text, so repeated strings are parsed only once. Thread-safe.
+class MarkupParser:
+
+    ALIGNMENT_OPERANDS = ( '$$HA_L', '$$HA_C', '$$HA_R', '$$HA_J' )
+
+    # { (text, multiline): tokens }, the last 4096 texts
+    __parsed = LruCache('Markup', max_size=4096)
+
+    # Returns tuple of paragraphs, each of them is a tuple of MarkupWord and AlignmentDirective objects.
+    # Style toggles do not cross paragraph boundaries.
+    @staticmethod
+    def parse(text:str):
+        return MarkupParser.__get_parsed(text, multiline=True)
+
+    # Returns tuple of MarkupWord objects, separated by single spaces. Alignment operands are not supported here.
+    @staticmethod
+    def parse_line(text:str):
+        return MarkupParser.__get_parsed(text, multiline=False)
+
+    @staticmethod
+    def __get_parsed(text:str, multiline:bool):
+        return MarkupParser.__parsed.get((text, multiline), lambda: MarkupParser.__parse(text, multiline))
+
+    @staticmethod
+    def __parse(text:str, multiline:bool):
+        if (multiline):
+            return tuple(MarkupParser.__parse_words(paragraph.split(), directives=True) for paragraph in text.split('\n'))
+        else:
+            return MarkupParser.__parse_words(text.split(' '), directives=False)
+
+    @staticmethod
+    def __parse_words(words, directives:bool):
+        tokens = []
+        bold = False
+        italic = False
+        for word in words:
+            if (directives and word.startswith('$$')):
+                if (word in MarkupParser.ALIGNMENT_OPERANDS):
+                    tokens.append(AlignmentDirective(word))
+                    continue
+                raise KeyError("Unsupported operand: {word}".format(word=word))
+
+            _word, bold, italic = MarkupParser.__parse_word(word, bold, italic)
+            tokens.append(_word)
+
+        return tuple(tokens)
+
+    @staticmethod
+    def __parse_word(word:str, bold:bool, italic:bool):
+        runs = []
+        run = ''
+        i = 0
+        while (i < len(word)):
+            _pair = word[i:i + 2]
+            if (_pair == '**' or _pair == '__'):
+                if (run):
+                    runs.append(StyledRun(run, bold, italic))
+                    run = ''
+
+                if (_pair == '**'):
+                    bold = not bold
+                else:
+                    italic = not italic
+                i += 2
+                continue
+
+            run += word[i]
+            i += 1
+
+        if (run):
+            runs.append(StyledRun(run, bold, italic))
+
+        return MarkupWord(word, tuple(runs)), bold, italic
+
+    @staticmethod
+    def get_stats():
+        return MarkupParser.__parsed.get_stats()
+
+    @staticmethod
+    def clear():
+        logger.debug("Clearing markup cache: {stats}".format(stats=MarkupParser.get_stats()))
+        MarkupParser.__parsed.clear()
@@ -0,0 +1,40 @@
+from PIL import Image, ImageDraw, ImageFont
+from hammerhal.lru_cache import LruCache
+from logging import getLogger
+logger = getLogger('hammerhal.text_drawer.sprite_cache')
+
+
+# Process-wide cache of rendered text sprites, keyed by (font file, font size, text).
+# Sprites are alpha masks, so the same sprite is pasted with any color.
+# Only short strings (labels, numbers, headers) are cached; least recently used sprites are evicted when the cache grows over 32 MB. Thread-safe.
+class SpriteCache:
+
+    max_text_length = 32
+
+    # { (font file, font size, text): (mask, (dx, dy)) }
+    __sprites = LruCache('Sprite', max_bytes=32 * 1024 * 1024, get_bytes=lambda sprite: sprite[0].width * sprite[0].height)
+
+    @staticmethod
+    def is_cacheable(text:str):
+        return len(text) <= SpriteCache.max_text_length
+
+    # Returns (mask, (dx, dy)): the alpha mask of the text and its offset from the drawing position
+    @staticmethod
+    def get_sprite(font:ImageFont.FreeTypeFont, font_path:str, font_size:int, text:str):
+        return SpriteCache.__sprites.get((font_path, font_size, text), lambda: SpriteCache.__render(font, text))
+
+    @staticmethod
+    def __render(font:ImageFont.FreeTypeFont, text:str):
+        x1, y1, x2, y2 = font.getbbox(text)
+        mask = Image.new('L', (max(x2 - x1, 0), max(y2 - y1, 0)), 0)
+        ImageDraw.Draw(mask).text((-x1, -y1), text, 255, font=font)
+        return mask, (x1, y1)
+
+    @staticmethod
+    def get_stats():
+        return SpriteCache.__sprites.get_stats()
+
+    @staticmethod
+    def clear():
+        logger.debug("Clearing sprite cache: {stats}".format(stats=SpriteCache.get_stats()))
+        SpriteCache.__sprites.clear()
@@ -1,346 +1,499 @@
-from PIL import Image, ImageDraw, ImageFont
-from hammerhal.text_drawer import FontFinder
-import inspect
-
-
-class Enum:
-    @classmethod
-    def find_value(cls, key):
-        if (isinstance(key, str)):
-            _members = inspect.getmembers(cls)
-            for _member in _members:
-                if (_member[0] == key):
-                    # print("{0} is {1}!".format(*_member))
-                    return _member[1]
-
-            # print("{0} not found".format(key))
-            return None
-
-        else:
-            # print("{0} is not a string; returning it")
-            return key
-
-class TextDrawer:
-
-    class CapitalizationModes(Enum):
-        Normal = 1
-        UpperCase = 2
-        AllCaps = 2
-        LowerCase = 3
-        NoCaps = 3
-        Capitalize = 4
-        SmallCaps = 5
-
-    class TextAlignment(Enum):
-        Left = 1
-        Top = 1
-        Center = 2
-        Right = 3
-        Bottom = 3
-        Justify = 4
-
-    __drawer = None
-    __font_finder = None
-
-    __current_font_size = None
-    __current_font_family = None
-    __current_font_filepath = None
-    __bold = None
-    __italic = None
-
-    __current_text_horizontal_alignment = None
-    __current_text_vertical_alignment = None
-    __current_text_capitalization = None
-    __font_base = None
-
-    character_width_scale  = None
-    text_character_separator_scale = None
-    text_vertical_space_scale = None
-    text_paragraph_vertical_space = None
-    text_space_scale = None
-
-    color = None
-
-    def __init__(self, im:Image.Image, font_nane=None, font_size=None, color=None, bold=None, italic=None, font_finder=None):
-        if (font_finder):
-            self.__font_finder = font_finder
-        else:
-            if (not TextDrawer.__font_finder):
-                TextDrawer.__font_finder = FontFinder()
-            self.__font_finder = TextDrawer.__font_finder
-
-        self.set_font(font_name=font_nane, font_size=font_size, color=color, bold=bold, italic=italic)
-        self.__drawer = ImageDraw.ImageDraw(im)
-
-    def set_font(self, font_name=None, font_size=None, color=None, bold=None, italic=None, horizontal_alignment=None, vertical_alignment=None, character_width_scale=None, space_scale=None, vertical_space_scale=None, paragraph_vertical_space=None, character_separator_scale=None, capitalization=None):
-        self.__current_font_size = int(font_size or self.__current_font_size or 10)
-        self.__current_font_family = font_name or self.__current_font_family or 'Times New Roman'
-
-        if (not bold is None):
-            self.__bold = bold
-        else:
-            self.__bold = self.__bold or False
-
-        if (not italic is None):
-            self.__italic = italic or self.__italic or False
-        else:
-            self.__italic = self.__italic or False
-
-        if not (font_name is None and bold is None and italic is None):
-            _test_font = None
-            if (font_name or self.__current_font_family is None):
-                _test_font = self.__font_finder.find_font_file_by_filename(font_name)
-                if (_test_font):
-                    self.__current_font_family = None
-
-            if not (_test_font):
-                _test_font = self.__font_finder.find_font_file_by_fontname(family_name=self.__current_font_family, bold=self.__bold, italic=self.__italic)
-                if (_test_font):                    
-                    self.__current_font_family = font_name
-                    
-            if not (_test_font):
-                raise FileNotFoundError("Requested font ({font_family}{bold}{italic}) is not installed".format(font_family=self.__current_font_family, bold=", Bold" if self.__bold else '', italic=", Italic" if self.__italic else ''))
-
-            self.__current_font_filepath = _test_font
-        else:
-            self.__current_font_filepath = self.__current_font_filepath or 'times.ttf'
-        self.__font_base = ImageFont.truetype(font=self.__current_font_filepath, size=self.__current_font_size, encoding='unic')
-
-        self.__current_text_vertical_alignment = TextDrawer.TextAlignment.find_value(vertical_alignment) or self.__current_text_vertical_alignment or TextDrawer.TextAlignment.Top
-        self.__current_text_horizontal_alignment = TextDrawer.TextAlignment.find_value(horizontal_alignment) or self.__current_text_horizontal_alignment or TextDrawer.TextAlignment.Left
-        self.__current_text_capitalization = TextDrawer.CapitalizationModes.find_value(capitalization) or self.__current_text_capitalization or TextDrawer.CapitalizationModes.Normal
-
-        if (not space_scale is None):
-            self.text_space_scale = space_scale
-        else:
-            self.text_space_scale = self.text_space_scale or 1.0
-
-        if (not vertical_space_scale is None):
-            self.text_vertical_space_scale = vertical_space_scale
-        else:
-            self.text_vertical_space_scale = self.text_vertical_space_scale or 0.0
-
-        if (not paragraph_vertical_space is None):
-            self.text_paragraph_vertical_space = paragraph_vertical_space
-        else:
-            self.text_paragraph_vertical_space = self.text_paragraph_vertical_space or 0
-
-        if (not character_separator_scale is None):
-            self.text_character_separator_scale = character_separator_scale
-        else:
-            self.text_character_separator_scale = self.text_character_separator_scale or 0.0
-
-        if (not character_width_scale is None):
-            self.character_width_scale = character_width_scale
-        else:
-            self.character_width_scale = self.character_width_scale or 1.0
-
-        self.color = color or self.color or 'white'
-
-    def get_font(self):
-        result_dict = \
-        {
-            'font_name': self.__current_font_family,
-            'font_size': self.__current_font_size,
-            'color': self.color,
-            'bold': self.__bold,
-            'italic': self.__italic,
-            'horizontal_alignment': self.__current_text_horizontal_alignment,
-            'vertical_alignment': self.__current_text_vertical_alignment,
-            'character_width_scale': self.character_width_scale,
-            'space_scale': self.text_space_scale,
-            'vertical_space_scale': self.text_paragraph_vertical_space,
-            'paragraph_vertical_space': self.text_paragraph_vertical_space,
-            'character_separator_scale': self.text_character_separator_scale,
-            'capitalization': self.__current_text_capitalization,
-        }
-
-        return result_dict
-
-    def print_line(self, position, text:str):
-        self.__print(position, text, real_print=True)
-
-    def print_in_region(self, region, text:str, offset_borders:bool=True):
-        return self.__print_in_region(region, text, offset_borders, real_print=True)
-
-    def get_text_size(self, region, text:str, offset_borders:bool=True):
-        return self.__print_in_region(region, text, offset_borders, real_print=False)
-
-    def __print_in_region(self, region, text:str, offset_borders, real_print):
-        if (offset_borders):
-            x, y, w, h = region
-        else:
-            x, y, x2, y2 = region
-            w = x2 - x
-            h = y2 - y
-
-        max_width = 0
-        space_width, _ = self.__print(None, ' ', real_print=False)
-        _, line_height = self.__print(None, 'LINE HEIGHT', real_print=False)
-        paragraphs = []
-        for paragraph in text.split('\n'):
-            _horizontal_alignment = self.__current_text_horizontal_alignment
-            paragraph_words = []
-            paragraph_lines_width = 0
-            words = paragraph.split()
-            lines = []
-            line = { 'words': [], 'width': 0, 'horizontal_alignment': _horizontal_alignment }
-            for word in words:
-                if (word.startswith('$$')):
-                    if (word == '$$HA_L'):
-                        _horizontal_alignment = TextDrawer.TextAlignment.Left
-                        line['horizontal_alignment'] = _horizontal_alignment
-                        continue
-                    if (word == '$$HA_C'):
-                        _horizontal_alignment = TextDrawer.TextAlignment.Center
-                        line['horizontal_alignment'] = _horizontal_alignment
-                        continue
-                    if (word == '$$HA_R'):
-                        _horizontal_alignment = TextDrawer.TextAlignment.Right
-                        line['horizontal_alignment'] = _horizontal_alignment
-                        continue
-                    if (word == '$$HA_J'):
-                        _horizontal_alignment = TextDrawer.TextAlignment.Justify
-                        line['horizontal_alignment'] = _horizontal_alignment
-                        continue
-                    raise KeyError("Unsupported operand: {word}".format(word=word))
-
-                paragraph_words.append(word)
-                paragraph_total_width, _ = self.__print(None, ' '.join(paragraph_words), real_print=False)
-                paragraph_total_width -= len(lines) * space_width
-                test_width = paragraph_total_width - paragraph_lines_width
-
-                if (not w or test_width <= w):
-                    line['width'] = test_width
-                    line['words'].append(word)
-                else:
-                    lines.append(line)
-                    word_width, _ = self.__print(None, word, real_print=False)
-                    paragraph_lines_width = paragraph_total_width - word_width - space_width
-                    line = { 'words': [ word ], 'width': word_width, 'horizontal_alignment': _horizontal_alignment }
-
-                if (max_width < line['width']):
-                    max_width = line['width']
-
-            lines.append(line)
-            paragraphs.append(lines)
-
-        num_lines = sum(len(paragraph) for paragraph in paragraphs)
-        total_height = int(num_lines * (1 + self.text_vertical_space_scale) * line_height + self.text_paragraph_vertical_space * (len(paragraphs) - 1))
-
-        if (real_print):
-            if (self.__current_text_vertical_alignment == TextDrawer.TextAlignment.Bottom):
-                _y = y + h - total_height
-            elif (self.__current_text_vertical_alignment == TextDrawer.TextAlignment.Center):
-                _y = y + (h - total_height) // 2
-            else:
-                _y = y
-
-            for paragraph in paragraphs:
-                for i in range(len(paragraph)):
-                    line = paragraph[i]
-                    last_line = (i + 1 == len(paragraph))
-
-                    new_space_width = space_width
-                    if (line['horizontal_alignment'] == TextDrawer.TextAlignment.Right):
-                        _x = x + w - line['width']
-                    elif (line['horizontal_alignment'] == TextDrawer.TextAlignment.Center):
-                        _x = x + (w - line['width']) // 2
-                    elif (line['horizontal_alignment'] == TextDrawer.TextAlignment.Justify and not last_line and len(line['words']) > 0):
-                        _x = x
-                        num_spaces = len(line['words']) - 1
-                        if (num_spaces > 0):
-                            new_space_width = space_width + (w - line['width']) / num_spaces
-                    else:
-                        _x = x
-
-                    self.__print((_x, _y), ' '.join(line['words']), real_print=True, restricted_space_width=new_space_width)
-                    _y += (1 + self.text_vertical_space_scale) * self.__current_font_size
-                _y += self.text_paragraph_vertical_space
-
-        return max_width, total_height
-
-
-    def __print(self, position, text: str, real_print:bool, restricted_space_width=None, debug_console_print:bool=False):
-        x, y = position or (0, 0)
-        max_height = 0
-
-
-
-        _text = text
-        if (self.__current_text_capitalization == TextDrawer.CapitalizationModes.UpperCase):
-            _text = _text.upper()
-        elif (self.__current_text_capitalization == TextDrawer.CapitalizationModes.LowerCase):
-            _text = _text.lower()
-        elif (self.__current_text_capitalization == TextDrawer.CapitalizationModes.Capitalize):
-            _text = ' '.join(_word.capitalize() for _word in _text.split(' '))
-
-        original_bold = self.__bold
-        original_italic = self.__italic
-        _continue = False
-
-        if (self.__current_text_capitalization == TextDrawer.CapitalizationModes.SmallCaps):
-            # _, _new_size = self._drawer.textsize(_char, font=_font)
-            _new_size = int(self.__current_font_size * 0.75)
-            _char = 'ixz'
-            _char = _char.upper()
-
-            _font = self.__font_base
-            _small_caps_font = ImageFont.truetype(font=self.__current_font_filepath, size=_new_size, encoding='unic')
-            _, _y1 = self.__drawer.textsize(_char, font=_small_caps_font)
-            _, _y2 = self.__drawer.textsize(_char, font=_font)
-            _small_caps_dy = _y2 - _y1
-
-        for i in range(len(_text)):
-            if (_continue):
-                _continue = False
-
-                if (self.__current_text_capitalization == TextDrawer.CapitalizationModes.SmallCaps):
-                    # _, _new_size = self._drawer.textsize(_char, font=_font)
-                    _new_size = int(self.__current_font_size * 0.75)
-                    _char = 'ixz'
-                    _char = _char.upper()
-
-                    _font = self.__font_base
-                    _small_caps_font = ImageFont.truetype(font=self.__current_font_filepath, size=_new_size, encoding='unic')
-                    _, _y1 = self.__drawer.textsize(_char, font=_font)
-                    _, _y2 = self.__drawer.textsize(_char, font=_small_caps_font)
-                    _small_caps_dy = _y2 - _y1
-
-                continue
-            if (i + 2 <= len(_text)):
-                if(_text[i:i+2] == '__'):
-                    self.set_font(italic=not self.__italic)
-                    _continue = True
-                    continue
-                if (_text[i:i + 2] == '**'):
-                    self.set_font(bold=not self.__bold)
-                    _continue = True
-                    continue
-
-            _char = _text[i]; _x = int(x); _y = int(y); _font = self.__font_base
-
-            if (self.__current_text_capitalization == TextDrawer.CapitalizationModes.SmallCaps and _char != _char.upper()):
-                _char = _char.upper()
-                _y += _small_caps_dy
-                _font = _small_caps_font
-            w, h = self.__drawer.textsize(_char, font=_font)
-            if (real_print):
-                if (debug_console_print):
-                    print(text[i], end='')
-                self.__drawer.text((_x, _y), _char, self.color, font=_font)
-            if (_char == ' '):
-                if (restricted_space_width):
-                    x += restricted_space_width
-                else:
-                    x += w * self.text_space_scale
-            else:
-                x += w + self.text_character_separator_scale * self.__current_font_size
-            if (max_height < h):
-                max_height = h
-
-        initial_x, _ = position or (0, 0)
-        if (debug_console_print):
-            print('', end='\n')
-        self.set_font(bold=original_bold, italic=original_italic)
-        return (x - initial_x, max_height)
+from PIL import Image, ImageDraw, ImageFont
+from hammerhal.text_drawer import FontFinder, FontCache, GlyphMetricsCache, SpriteCache, MarkupParser, LineBreaker, LayoutLine, TextLayout
+import inspect
+
+
+class Enum:
+    # { enum class: { member name: value } }, so inspect.getmembers() runs once per class
+    __members = {}
+
+    @classmethod
+    def find_value(cls, key):
+        if (isinstance(key, str)):
+            _members = Enum.__members.get(cls, None)
+            if (_members is None):
+                _members = dict(inspect.getmembers(cls))
+                Enum.__members[cls] = _members
+
+            return _members.get(key, None)
+
+        else:
+            return key
+
+class TextDrawer:
+
+    class CapitalizationModes(Enum):
+        Normal = 1
+        UpperCase = 2
+        AllCaps = 2
+        LowerCase = 3
+        NoCaps = 3
+        Capitalize = 4
+        SmallCaps = 5
+
+    class TextAlignment(Enum):
+        Left = 1
+        Top = 1
+        Center = 2
+        Right = 3
+        Bottom = 3
+        Justify = 4
+
+    class RenderModes(Enum):
+        PerGlyph = 1
+        Runs = 2
+
+    class MetricsBackends(Enum):
+        Pillow = 1
+        FontTools = 2
+
+    __ALIGNMENT_OPERANDS = \
+    {
+        '$$HA_L': TextAlignment.Left,
+        '$$HA_C': TextAlignment.Center,
+        '$$HA_R': TextAlignment.Right,
+        '$$HA_J': TextAlignment.Justify,
+    }
+
+    __FIT_MAX_ITERATIONS = 16
+
+    __image = None
+    __drawer = None
+    __font_finder = None
+
+    __current_font_size = None
+    __current_font_family = None
+    __current_font_filepath = None
+    __bold = None
+    __italic = None
+
+    __current_text_horizontal_alignment = None
+    __current_text_vertical_alignment = None
+    __current_text_capitalization = None
+    __font_base = None
+    __style_fonts = None
+
+    character_width_scale  = None
+    text_character_separator_scale = None
+    text_vertical_space_scale = None
+    text_paragraph_vertical_space = None
+    text_space_scale = None
+
+    color = None
+
+    # Runs break some lines differently than the glyphs (the runs are kerned), so they are not the default yet
+    default_render_mode = RenderModes.PerGlyph
+    render_mode = None
+    default_metrics_backend = MetricsBackends.Pillow
+    metrics_backend = None
+
+    def __init__(self, im:Image.Image, font_nane=None, font_size=None, color=None, bold=None, italic=None, font_finder=None, render_mode=None, metrics_backend=None):
+        self.render_mode = TextDrawer.RenderModes.find_value(render_mode) or TextDrawer.default_render_mode
+        self.metrics_backend = TextDrawer.MetricsBackends.find_value(metrics_backend) or TextDrawer.default_metrics_backend
+        if (font_finder):
+            self.__font_finder = font_finder
+        else:
+            if (not TextDrawer.__font_finder):
+                TextDrawer.__font_finder = FontFinder()
+            self.__font_finder = TextDrawer.__font_finder
+
+        self.set_font(font_name=font_nane, font_size=font_size, color=color, bold=bold, italic=italic)
+        self.__image = im
+        self.__drawer = ImageDraw.ImageDraw(im)
+
+    def set_font(self, font_name=None, font_size=None, color=None, bold=None, italic=None, horizontal_alignment=None, vertical_alignment=None, character_width_scale=None, space_scale=None, vertical_space_scale=None, paragraph_vertical_space=None, character_separator_scale=None, capitalization=None):
+        self.__current_font_size = int(font_size or self.__current_font_size or 10)
+        if (font_name):
+            self.__current_font_family = font_name
+        elif not (self.__current_font_family or self.__current_font_filepath):
+            self.__current_font_family = 'Times New Roman'
+
+        if (not bold is None):
+            self.__bold = bold
+        else:
+            self.__bold = self.__bold or False
+
+        if (not italic is None):
+            self.__italic = italic
+        else:
+            self.__italic = self.__italic or False
+
+        if not (font_name is None and bold is None and italic is None):
+            _test_font = None
+            if (font_name):
+                _test_font = self.__font_finder.find_font_file_by_filename(font_name)
+                if (_test_font):
+                    self.__current_font_family = None
+
+            if not (_test_font):
+                if (self.__current_font_family):
+                    _test_font = self.__font_finder.find_font_file_by_fontname(family_name=self.__current_font_family, bold=self.__bold, italic=self.__italic)
+                else:
+                    # Font was loaded by the filename, so there are no known bold/italic variants of it
+                    _test_font = self.__current_font_filepath
+
+            if not (_test_font):
+                raise FileNotFoundError("Requested font ({font_family}{bold}{italic}) is not installed".format(font_family=self.__current_font_family, bold=", Bold" if self.__bold else '', italic=", Italic" if self.__italic else ''))
+
+            self.__current_font_filepath = _test_font
+        else:
+            self.__current_font_filepath = self.__current_font_filepath or 'times.ttf'
+        self.__font_base = FontCache.get_font(self.__current_font_filepath, self.__current_font_size, 'unic')
+        self.__style_fonts = dict()
+
+        self.__current_text_vertical_alignment = TextDrawer.TextAlignment.find_value(vertical_alignment) or self.__current_text_vertical_alignment or TextDrawer.TextAlignment.Top
+        self.__current_text_horizontal_alignment = TextDrawer.TextAlignment.find_value(horizontal_alignment) or self.__current_text_horizontal_alignment or TextDrawer.TextAlignment.Left
+        self.__current_text_capitalization = TextDrawer.CapitalizationModes.find_value(capitalization) or self.__current_text_capitalization or TextDrawer.CapitalizationModes.Normal
+
+        if (not space_scale is None):
+            self.text_space_scale = space_scale
+        else:
+            self.text_space_scale = self.text_space_scale or 1.0
+
+        if (not vertical_space_scale is None):
+            self.text_vertical_space_scale = vertical_space_scale
+        else:
+            self.text_vertical_space_scale = self.text_vertical_space_scale or 0.0
+
+        if (not paragraph_vertical_space is None):
+            self.text_paragraph_vertical_space = paragraph_vertical_space
+        else:
+            self.text_paragraph_vertical_space = self.text_paragraph_vertical_space or 0
+
+        if (not character_separator_scale is None):
+            self.text_character_separator_scale = character_separator_scale
+        else:
+            self.text_character_separator_scale = self.text_character_separator_scale or 0.0
+
+        if (not character_width_scale is None):
+            self.character_width_scale = character_width_scale
+        else:
+            self.character_width_scale = self.character_width_scale or 1.0
+
+        self.color = color or self.color or 'white'
+
+    def get_font(self):
+        result_dict = \
+        {
+            'font_name': self.__current_font_family,
+            'font_size': self.__current_font_size,
+            'color': self.color,
+            'bold': self.__bold,
+            'italic': self.__italic,
+            'horizontal_alignment': self.__current_text_horizontal_alignment,
+            'vertical_alignment': self.__current_text_vertical_alignment,
+            'character_width_scale': self.character_width_scale,
+            'space_scale': self.text_space_scale,
+            'vertical_space_scale': self.text_vertical_space_scale,
+            'paragraph_vertical_space': self.text_paragraph_vertical_space,
+            'character_separator_scale': self.text_character_separator_scale,
+            'capitalization': self.__current_text_capitalization,
+        }
+
+        return result_dict
+
+    def print_line(self, position, text:str):
+        self.__print(position, MarkupParser.parse_line(text), real_print=True)
+
+    def print_in_region(self, region, text:str, offset_borders:bool=True):
+        layout = self.get_text_layout(region, text, offset_borders)
+        return self.print_layout(layout, region, offset_borders)
+
+    def get_text_size(self, region, text:str, offset_borders:bool=True):
+        return self.get_text_layout(region, text, offset_borders).size
+
+    def get_text_layout(self, region, text:str, offset_borders:bool=True) -> TextLayout:
+        _, _, w, _ = TextDrawer.__get_region_box(region, offset_borders)
+
+        space_width, _ = self.__get_space_size()
+        _, line_height = self.__print(None, MarkupParser.parse_line('LINE HEIGHT'), real_print=False)
+        line_breaker = LineBreaker(measure_word=self.__measure_word, space_width=space_width, max_width=w, operands=TextDrawer.__ALIGNMENT_OPERANDS)
+
+        paragraphs = []
+        for paragraph in MarkupParser.parse(text):
+            lines = line_breaker.break_paragraph(paragraph, self.__current_text_horizontal_alignment)
+            paragraphs.append(lines)
+
+        max_width = max(line.width for paragraph in paragraphs for line in paragraph)
+        num_lines = sum(len(paragraph) for paragraph in paragraphs)
+        total_height = int(num_lines * (1 + self.text_vertical_space_scale) * line_height + self.text_paragraph_vertical_space * (len(paragraphs) - 1))
+
+        positioned_lines = []
+        _y = 0
+        for paragraph in paragraphs:
+            for i in range(len(paragraph)):
+                line = paragraph[i]
+                last_line = (i + 1 == len(paragraph))
+
+                _space_width = space_width
+                if (line.horizontal_alignment == TextDrawer.TextAlignment.Right):
+                    _x = w - line.width
+                elif (line.horizontal_alignment == TextDrawer.TextAlignment.Center):
+                    _x = (w - line.width) // 2
+                elif (line.horizontal_alignment == TextDrawer.TextAlignment.Justify and not last_line and len(line.words) > 0):
+                    _x = 0
+                    num_spaces = len(line.words) - 1
+                    if (num_spaces > 0):
+                        _space_width = space_width + (w - line.width) / num_spaces
+                else:
+                    _x = 0
+
+                positioned_lines.append(LayoutLine(line.words, line.width, line.horizontal_alignment, x=_x, y=_y, space_width=_space_width))
+                _y += (1 + self.text_vertical_space_scale) * self.__current_font_size
+            _y += self.text_paragraph_vertical_space
+
+        return TextLayout(lines=positioned_lines, width=max_width, height=total_height, region_width=w, font=self.get_font())
+
+    def fit_font_size(self, fits, min_font_size:int=None, max_font_size:int=None) -> int:
+        # Sets the largest font size within the bounds for which fits() returns True.
+        # If none of them fits, the min_font_size is set.
+        max_font_size = int(max_font_size or self.__current_font_size)
+        min_font_size = int(min(min_font_size or max_font_size, max_font_size))
+
+        self.set_font(font_size=max_font_size)
+        if (fits()):
+            return max_font_size
+
+        result = min_font_size
+        low = min_font_size
+        high = max_font_size - 1
+        for _ in range(TextDrawer.__FIT_MAX_ITERATIONS):
+            if (low > high):
+                break
+
+            _size = (low + high) // 2
+            self.set_font(font_size=_size)
+            if (fits()):
+                result = _size
+                low = _size + 1
+            else:
+                high = _size - 1
+
+        self.set_font(font_size=result)
+        return result
+
+    # Same as get_text_layout(), but the font size is reduced (and left set) until the text fits the region
+    def fit_text_layout(self, region, text:str, offset_borders:bool=True, min_font_size:int=None, max_font_size:int=None) -> TextLayout:
+        _, _, w, h = TextDrawer.__get_region_box(region, offset_borders)
+
+        def fits():
+            _w, _h = self.get_text_size(region, text, offset_borders)
+            return _w <= w and _h <= h
+
+        self.fit_font_size(fits, min_font_size, max_font_size)
+        return self.get_text_layout(region, text, offset_borders)
+
+    def print_layout(self, layout:TextLayout, region, offset_borders:bool=True):
+        x, y, _, h = TextDrawer.__get_region_box(region, offset_borders)
+
+        _font = self.get_font()
+        if (_font != layout.font):
+            self.set_font(**layout.font)
+
+        if (self.__current_text_vertical_alignment == TextDrawer.TextAlignment.Bottom):
+            _y = y + h - layout.height
+        elif (self.__current_text_vertical_alignment == TextDrawer.TextAlignment.Center):
+            _y = y + (h - layout.height) // 2
+        else:
+            _y = y
+
+        for line in layout.lines:
+            self.__print((x + line.x, _y + line.y), line.words, real_print=True, restricted_space_width=line.space_width)
+
+        if (_font != layout.font):
+            self.set_font(**_font)
+
+        return layout.size
+
+    @staticmethod
+    def __get_region_box(region, offset_borders):
+        if (offset_borders):
+            x, y, w, h = region
+        else:
+            x, y, x2, y2 = region
+            w = x2 - x
+            h = y2 - y
+
+        return x, y, w, h
+
+    def __measure_word(self, word):
+        width, _ = self.__print(None, (word,), real_print=False)
+        return width
+
+    def __is_runs_mode(self):
+        # Runs could not express the additional space between characters
+        return self.render_mode == TextDrawer.RenderModes.Runs and not self.text_character_separator_scale
+
+    def __get_space_size(self):
+        style = (self.__bold, self.__italic)
+        w, h = self.__get_size(self.__font_base, self.__current_font_filepath, self.__current_font_size, style, ' ', run=self.__is_runs_mode())
+
+        return w * self.text_space_scale, h
+
+    def __get_size(self, font:ImageFont.FreeTypeFont, font_path:str, font_size:int, style, text:str, run:bool):
+        # Analytic metrics never touch the rasterizer, so only the final drawing needs FreeType
+        if (self.metrics_backend == TextDrawer.MetricsBackends.FontTools):
+            return GlyphMetricsCache.get_analytic_size(self.__drawer, font, font_path, font_size, style, text)
+        elif (run):
+            return GlyphMetricsCache.get_run_size(self.__drawer, font, font_path, font_size, style, text)
+        else:
+            return GlyphMetricsCache.get_char_size(self.__drawer, font, font_path, font_size, style, text)
+
+    def __find_font_file(self, bold:bool, italic:bool):
+        if (self.__current_font_family):
+            return self.__font_finder.find_font_file_by_fontname(family_name=self.__current_font_family, bold=bold, italic=italic)
+        else:
+            # Font was loaded by the filename, so there are no known bold/italic variants of it
+            return self.__current_font_filepath
+
+    def __get_style_font(self, bold:bool, italic:bool):
+        if (bold == self.__bold and italic == self.__italic):
+            return self.__current_font_filepath, self.__font_base
+
+        key = (bold, italic)
+        result = self.__style_fonts.get(key, None)
+        if (not result):
+            _path = self.__find_font_file(bold, italic)
+            if not (_path):
+                raise FileNotFoundError("Requested font ({font_family}{bold}{italic}) is not installed".format(font_family=self.__current_font_family, bold=", Bold" if bold else '', italic=", Italic" if italic else ''))
+
+            result = (_path, FontCache.get_font(_path, self.__current_font_size, 'unic'))
+            self.__style_fonts[key] = result
+
+        return result
+
+    def __get_small_caps_font(self, font_path:str, font:ImageFont.FreeTypeFont, style):
+        _new_size = int(self.__current_font_size * 0.75)
+        _small_caps_font = FontCache.get_font(font_path, _new_size, 'unic')
+
+        _char = 'IXZ'
+        _, _y1 = self.__get_size(_small_caps_font, font_path, _new_size, style, _char, run=False)
+        _, _y2 = self.__get_size(font, font_path, self.__current_font_size, style, _char, run=False)
+        _small_caps_dy = _y2 - _y1
+
+        return _small_caps_font, _new_size, _small_caps_dy
+
+    def __capitalize(self, text:str, first:bool):
+        if (self.__current_text_capitalization == TextDrawer.CapitalizationModes.UpperCase):
+            return text.upper()
+        elif (self.__current_text_capitalization == TextDrawer.CapitalizationModes.LowerCase):
+            return text.lower()
+        elif (self.__current_text_capitalization == TextDrawer.CapitalizationModes.Capitalize):
+            return text.capitalize() if (first) else text.lower()
+        else:
+            return text
+
+    def __print(self, position, words, real_print:bool, restricted_space_width=None, debug_console_print:bool=False):
+        x, y = position or (0, 0)
+        initial_x = x
+        max_height = 0
+        runs_mode = self.__is_runs_mode()
+
+        for i, word in enumerate(words):
+            if (i > 0):
+                w, h = self.__get_space_size()
+                if (restricted_space_width):
+                    x += restricted_space_width
+                else:
+                    x += w
+                if (max_height < h):
+                    max_height = h
+                if (debug_console_print):
+                    print(' ', end='')
+
+            for j, run in enumerate(word.runs):
+                _text = self.__capitalize(run.text, first=(j == 0))
+                _bold = (self.__bold != run.bold)
+                _italic = (self.__italic != run.italic)
+                if (runs_mode):
+                    x, h = self.__print_run(x, y, _text, _bold, _italic, real_print)
+                else:
+                    x, h = self.__print_glyphs(x, y, _text, _bold, _italic, real_print)
+                if (max_height < h):
+                    max_height = h
+                if (debug_console_print):
+                    print(_text, end='')
+
+        if (debug_console_print):
+            print('', end='\n')
+        return (x - initial_x, max_height)
+
+    def __print_glyphs(self, x, y, text:str, bold:bool, italic:bool, real_print:bool):
+        max_height = 0
+        style = (bold, italic)
+        font_path, font = self.__get_style_font(bold, italic)
+        small_caps = (self.__current_text_capitalization == TextDrawer.CapitalizationModes.SmallCaps)
+        if (small_caps):
+            _small_caps_font, _new_size, _small_caps_dy = self.__get_small_caps_font(font_path, font, style)
+
+        for _char in text:
+            _x = int(x); _y = int(y); _font = font; _font_size = self.__current_font_size
+
+            if (small_caps and _char != _char.upper()):
+                _char = _char.upper()
+                _y += _small_caps_dy
+                _font = _small_caps_font
+                _font_size = _new_size
+            w, h = self.__get_size(_font, font_path, _font_size, style, _char, run=False)
+            if (real_print):
+                self.__draw_text((_x, _y), _char, _font, font_path, _font_size)
+            x += w + self.text_character_separator_scale * self.__current_font_size
+            if (max_height < h):
+                max_height = h
+
+        return x, max_height
+
+    def __print_run(self, x, y, text:str, bold:bool, italic:bool, real_print:bool):
+        max_height = 0
+        style = (bold, italic)
+        font_path, font = self.__get_style_font(bold, italic)
+        small_caps = (self.__current_text_capitalization == TextDrawer.CapitalizationModes.SmallCaps)
+        if (small_caps):
+            _small_caps_font, _new_size, _small_caps_dy = self.__get_small_caps_font(font_path, font, style)
+
+        for small, run in TextDrawer.__split_small_caps(text, small_caps):
+            _y = y; _font = font; _font_size = self.__current_font_size
+            if (small):
+                run = run.upper()
+                _y += _small_caps_dy
+                _font = _small_caps_font
+                _font_size = _new_size
+
+            w, h = self.__get_size(_font, font_path, _font_size, style, run, run=True)
+            if (real_print):
+                self.__draw_text((int(x), int(_y)), run, _font, font_path, _font_size)
+            x += w
+            if (max_height < h):
+                max_height = h
+
+        return x, max_height
+
+    def __draw_text(self, position, text:str, font:ImageFont.FreeTypeFont, font_path:str, font_size:int):
+        # Short strings repeat across the cards, so they are rasterized once and pasted later
+        if (SpriteCache.is_cacheable(text)):
+            mask, (dx, dy) = SpriteCache.get_sprite(font, font_path, font_size, text)
+            x, y = position
+            self.__image.paste(self.color, (x + dx, y + dy), mask)
+        else:
+            self.__drawer.text(position, text, self.color, font=font)
+
+    @staticmethod
+    def __split_small_caps(text:str, small_caps:bool):
+        # Yields (small, run) pairs, where small runs are lowercase letters printed with the small caps font
+        if (not small_caps):
+            yield False, text
+            return
+
+        run = ''
+        run_small = False
+        for _char in text:
+            _small = (_char != _char.upper())
+            if (run and _small != run_small):
+                yield run_small, run
+                run = ''
+
+            run += _char
+            run_small = _small
+
+        if (run):
+            yield run_small, run
@@ -0,0 +1,98 @@
+import types
+from hammerhal.text_drawer import AlignmentDirective
+
+
+# Words and lines are immutable like TextLayout, so a cached layout could not be changed by whoever holds it
+class LayoutWord:
+    __slots__ = ('text', 'runs', 'width')
+
+    def __init__(self, text:str, runs, width):
+        object.__setattr__(self, 'text', text)
+        object.__setattr__(self, 'runs', tuple(runs))
+        object.__setattr__(self, 'width', width)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("LayoutWord is immutable")
+
+class LayoutLine:
+    __slots__ = ('words', 'width', 'horizontal_alignment', 'x', 'y', 'space_width')
+
+    # x, y: position relative to the layout origin; space_width: None until the line is positioned
+    def __init__(self, words, width, horizontal_alignment, x=0, y=0, space_width=None):
+        object.__setattr__(self, 'words', tuple(words))
+        object.__setattr__(self, 'width', width)
+        object.__setattr__(self, 'horizontal_alignment', horizontal_alignment)
+        object.__setattr__(self, 'x', x)
+        object.__setattr__(self, 'y', y)
+        object.__setattr__(self, 'space_width', space_width)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("LayoutLine is immutable")
+
+    def get_text(self):
+        return ' '.join(word.text for word in self.words)
+
+# Greedy line breaker over the tokens of MarkupParser.
+# Every word is measured exactly once, and the width of the current line is tracked incrementally.
+class LineBreaker:
+
+    measure_word = None
+    space_width = None
+    max_width = None
+    operands = None
+
+    def __init__(self, measure_word, space_width, max_width, operands:dict):
+        self.measure_word = measure_word
+        self.space_width = space_width
+        self.max_width = max_width
+        self.operands = operands
+
+    # Returns list of the unpositioned LayoutLine objects
+    def break_paragraph(self, tokens, horizontal_alignment):
+        lines = []
+        words = []
+        width = 0
+        line_alignment = horizontal_alignment
+        for token in tokens:
+            if (isinstance(token, AlignmentDirective)):
+                horizontal_alignment = self.operands[token.operand]
+                line_alignment = horizontal_alignment
+                continue
+
+            word_width = self.measure_word(token)
+            if (words):
+                test_width = width + self.space_width + word_width
+            else:
+                test_width = word_width
+
+            if (not self.max_width or not words or test_width <= self.max_width):
+                width = test_width
+            else:
+                lines.append(LayoutLine(words, width, line_alignment))
+                words = []
+                width = word_width
+                line_alignment = horizontal_alignment
+
+            words.append(LayoutWord(token.text, token.runs, word_width))
+
+        lines.append(LayoutLine(words, width, line_alignment))
+        return lines
+
+# Result of the text layout: positioned lines, total size and the font state it was measured with.
+# Could be printed any number of times by TextDrawer.print_layout() without measuring text again. Immutable, including the lines and the font.
+class TextLayout:
+    __slots__ = ('lines', 'width', 'height', 'region_width', 'font')
+
+    def __init__(self, lines, width, height, region_width, font:dict):
+        object.__setattr__(self, 'lines', tuple(lines))
+        object.__setattr__(self, 'width', width)
+        object.__setattr__(self, 'height', height)
+        object.__setattr__(self, 'region_width', region_width)
+        object.__setattr__(self, 'font', types.MappingProxyType(dict(font)))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("TextLayout is immutable")
+
+    @property
+    def size(self):
+        return self.width, self.height
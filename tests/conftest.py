@@ -0,0 +1,6 @@
+import os, sys
+
+# Tests run against the sources, the package does not need to be installed
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+FONTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts')
@@ -0,0 +1,97 @@
+import json
+from io import BytesIO
+import pytest
+from PIL import Image
+
+from hammerhal.compilers.compiler_base import CompilerBase
+from hammerhal.compilers.batch_compiler import BatchCompiler, BatchResult
+from hammerhal.compilers.font_preloader import FontPreloader
+from hammerhal.compilers.image_exporter import ImageExporter, OutputProfile
+
+SCHEMA = \
+{
+    'type': 'object',
+    'required': [ 'name', 'color' ],
+    'properties': { 'name': { 'type': 'string' }, 'color': { 'type': 'string' }, 'fail': { 'type': 'boolean' } },
+}
+
+
+# Paints the left half of the card in the raw color
+class HalfModule:
+    def __init__(self, parent, index):
+        self.parent = parent
+        self.index = index
+
+    def compile(self):
+        if (self.parent.raw.get('fail', False)):
+            raise ValueError("Broken card")
+        return self
+
+    def insert(self, base):
+        base.paste(self.parent.raw['color'], (0, 0, base.width // 2, base.height))
+
+# Compiles the raw dicts only, without the configs, card templates or raw files
+class StubCompiler(CompilerBase):
+    compiler_type = 'stub'
+    modules = [ HalfModule ]
+
+    def __init__(self, schema_path:str):
+        self.schema_path = schema_path
+        self.output_profiles = \
+        {
+            'print': OutputProfile('print'),
+            'web': OutputProfile('web', 40, 'web/', ImageExporter({ 'format': 'JPEG' })),
+        }
+
+    def prepare_base(self):
+        return Image.new('RGB', (80, 60), 'white')
+
+@pytest.fixture
+def compiler(tmp_path):
+    schema_path = tmp_path / 'stub.json'
+    with open(str(schema_path), 'w', encoding='utf-8') as file:
+        json.dump(SCHEMA, file)
+    return StubCompiler(str(schema_path))
+
+
+def test_raws_are_compiled_in_memory(compiler):
+    results = list(BatchCompiler(compiler, profiles=[ 'print', 'web' ]).compile([ { 'name': 'Red Card', 'color': 'red' }, { 'name': 'Blue Card', 'color': 'blue' } ]))
+    assert [ (result.index, result.name, result.status, result.errors) for result in results ] == [ (0, 'Red Card', BatchResult.COMPILED, [ ]), (1, 'Blue Card', BatchResult.COMPILED, [ ]) ]
+    assert all(result.ok for result in results)
+
+    red = results[0]
+    assert red.image.size == (80, 60)
+    assert red.image.getpixel((0, 0)) == (255, 0, 0)
+    assert red.image.getpixel((79, 0)) == (255, 255, 255)
+    assert red.outputs['print'].size == (80, 60)
+    assert red.outputs['web'].size == (40, 30)
+    assert results[1].image.getpixel((0, 0)) == (0, 0, 255)
+
+def test_outputs_are_encoded_by_the_profiles(compiler):
+    result, = BatchCompiler(compiler, profiles='web', encode=True).compile([ { 'name': 'Red Card', 'color': 'red' } ])
+    assert list(result.outputs) == [ 'web' ]
+    image = Image.open(BytesIO(result.outputs['web']))
+    assert (image.format, image.size) == ('JPEG', (40, 30))
+
+def test_bad_raws_are_reported_and_the_others_compiled(compiler):
+    raws = \
+    [
+        { 'name': 'No Color' },
+        { 'name': 'Wrong Color', 'color': 5 },
+        { 'name': 'Broken Card', 'color': 'red', 'fail': True },
+        { 'name': 'Red Card', 'color': 'red' },
+    ]
+    results = list(BatchCompiler(compiler, profiles='print').compile(raws))
+    assert [ result.status for result in results ] == [ BatchResult.FAILED, BatchResult.FAILED, BatchResult.FAILED, BatchResult.COMPILED ]
+    assert results[0].errors == [ "(root): 'color' is a required property" ]
+    assert results[1].errors == [ "color: 5 is not of type 'string'" ]
+    assert results[2].errors == [ "Cannot compile Broken Card" ]
+    for result in results[:3]:
+        assert not result.ok and result.image is None and result.outputs == { }
+    assert results[3].outputs['print'].getpixel((0, 0)) == (255, 0, 0)
+
+def test_missing_fonts_fail_the_cards(compiler, monkeypatch):
+    monkeypatch.setattr(FontPreloader, 'wait', lambda compiler_type=None: [ ('Lato', False, False) ])
+    result, = BatchCompiler(compiler, profiles='print').compile([ { 'name': 'Red Card', 'color': 'red' } ])
+    assert result.status == BatchResult.FAILED
+    assert result.errors == [ "Fonts are missing: Lato" ]
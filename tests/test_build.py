@@ -0,0 +1,208 @@
+import os, json, logging
+import importlib.util
+import pytest
+from PIL import Image
+
+from hammerhal import ConfigLoader
+from hammerhal.compilers.compiler_base import CompilerBase
+from hammerhal.compilers.build_manifest import BuildManifest
+from hammerhal.compilers.card_builder import CardBuilder
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCHEMA = \
+{
+    'type': 'object',
+    'required': [ 'name', 'color' ],
+    'properties': { 'name': { 'type': 'string' }, 'color': { 'type': 'string' }, 'fail': { 'type': 'boolean' }, 'crash': { 'type': 'boolean' } },
+}
+
+def get_compiler_config(compiler_type:str, stripe_width:int):
+    return \
+    {
+        'modules': { 'stripe': { 'width': stripe_width } },
+        'rawDirectory': compiler_type + '/',
+        'outputDirectory': compiler_type + '/',
+        'baseNameTemplate': 'base.png',
+        'outputProfiles': { 'web': { 'width': 40 }, 'print': { 'width': None, 'directorySuffix': 'print/' } },
+        'defaultOutputProfiles': [ 'web' ],
+    }
+
+
+# Paints a stripe of the raw color, the width comes from the module config
+class StripeModule:
+    inputs = ()
+    outputs = ()
+
+    def __init__(self, parent, index):
+        self.parent = parent
+        self.index = index
+
+    def compile(self):
+        if (self.parent.raw.get('fail', False)):
+            raise ValueError("Broken card")
+        # Kills the worker process, the cards are compiled in the workers only with --jobs
+        if (self.parent.raw.get('crash', False)):
+            os._exit(1)
+
+        self.width = ConfigLoader.get_from_config('compilerTypeSpecific/{type}/modules/stripe/width'.format(type=self.parent.compiler_type), 'compilers')
+        return self
+
+    def insert(self, base):
+        base.paste(self.parent.raw['color'], (0, 0, self.width, base.height))
+
+# Module level, so the worker processes could create them
+class StubCompiler(CompilerBase):
+    compiler_type = 'stub'
+    modules = [ StripeModule ]
+
+class OtherStubCompiler(StubCompiler):
+    compiler_type = 'other'
+
+
+# Project directory with the configs, schemas, card template and raw files of the stub compilers, as the working directory
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    for directory in ('configs', 'schemas', 'compiler_images', 'raw/stub', 'raw/other'):
+        (tmp_path / directory).mkdir(parents=True)
+
+    main_config = \
+    {
+        'configDirectory': 'configs/',
+        'compilersConfig': 'compilers.json',
+        'rawDirectoryRoot': 'raw/',
+        'textRenderMode': 'PerGlyph',
+        'textMetricsBackend': 'Pillow',
+    }
+    write_json(tmp_path / 'configs' / 'hammerhal.json', main_config)
+    write_compilers_config(tmp_path, stripe_width=20)
+    for compiler_type in ('stub', 'other'):
+        write_json(tmp_path / 'schemas' / '{type}.json'.format(type=compiler_type), SCHEMA)
+    Image.new('RGB', (80, 60), 'white').save(str(tmp_path / 'compiler_images' / 'base.png'))
+
+    write_json(tmp_path / 'raw' / 'stub' / 'red.json', { 'name': 'Red Card', 'color': 'red' })
+    write_json(tmp_path / 'raw' / 'stub' / 'blue.json', { 'name': 'Blue Card', 'color': 'blue' })
+    write_json(tmp_path / 'raw' / 'other' / 'green.json', { 'name': 'Green Card', 'color': 'green' })
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(CompilerBase, 'index_directory', str(tmp_path / 'cache'))
+    ConfigLoader.load_configs('configs/hammerhal.json')
+    return tmp_path
+
+def write_json(path, data):
+    with open(str(path), 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+
+def write_compilers_config(directory, stripe_width:int):
+    config = \
+    {
+        'schemasDirectory': 'schemas/',
+        'sourcesDirectory': 'compiler_images/',
+        'outputDirectoryRoot': 'output/',
+        'compilerTypeSpecific': { compiler_type: get_compiler_config(compiler_type, stripe_width) for compiler_type in ('stub', 'other') },
+    }
+    write_json(directory / 'configs' / 'compilers.json', config)
+
+def build(name:str, force=False, profiles=None):
+    compiler = StubCompiler()
+    manifest = BuildManifest()
+    status, filenames, _ = CardBuilder.build(compiler, 'raw/stub/{name}.json'.format(name=name), compiler.get_output_profiles(profiles), manifest, force=force)
+    manifest.save()
+    return status, filenames
+
+def load_compile_script():
+    spec = importlib.util.spec_from_file_location('compile_script', os.path.join(ROOT_DIRECTORY, 'compile.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_up_to_date_card_is_skipped(project):
+    status, filenames = build('red')
+    assert status == CardBuilder.REBUILT
+    assert filenames == [ 'output/stub/Red Card.png' ]
+    _mtime = os.stat(filenames[0]).st_mtime_ns
+
+    assert build('red') == (CardBuilder.SKIPPED, filenames)
+    assert os.stat(filenames[0]).st_mtime_ns == _mtime
+
+    # Every output of the card is checked, the new profiles are built
+    assert build('red', profiles='web,print')[0] == CardBuilder.REBUILT
+    assert build('red', profiles='print')[0] == CardBuilder.SKIPPED
+
+def test_card_is_rebuilt_after_input_change(project):
+    build('red')
+    write_json(project / 'raw' / 'stub' / 'red.json', { 'name': 'Red Card', 'color': 'maroon' })
+    status, filenames = build('red')
+    assert status == CardBuilder.REBUILT
+    assert Image.open(filenames[0]).convert('RGB').getpixel((0, 0)) == (128, 0, 0)
+
+    # Deleted outputs are not up to date either
+    os.remove(filenames[0])
+    assert build('red')[0] == CardBuilder.REBUILT
+
+def test_card_is_rebuilt_after_config_change(project):
+    build('red')
+    write_compilers_config(project, stripe_width=40)
+    ConfigLoader.reload_configs()
+    status, filenames = build('red')
+    assert status == CardBuilder.REBUILT
+    assert Image.open(filenames[0]).convert('RGB').getpixel((15, 0)) == (255, 0, 0)
+    assert build('red')[0] == CardBuilder.SKIPPED
+
+def test_force_rebuilds_up_to_date_card(project):
+    build('red')
+    assert build('red', force=True)[0] == CardBuilder.REBUILT
+    assert build('red')[0] == CardBuilder.SKIPPED
+
+def test_failed_card_is_not_recorded(project):
+    write_json(project / 'raw' / 'stub' / 'red.json', { 'name': 'Red Card', 'color': 'red', 'fail': True })
+    assert build('red') == (CardBuilder.FAILED, [ ])
+    assert BuildManifest().outputs == { }
+
+@pytest.mark.parametrize('jobs', [ None, '2' ])
+def test_compile_all_exit_codes(project, monkeypatch, caplog, jobs):
+    compile_script = load_compile_script()
+    monkeypatch.setattr(compile_script, 'HeroCompiler', StubCompiler)
+    monkeypatch.setattr(compile_script, 'AdversaryCompiler', OtherStubCompiler)
+    logger = logging.getLogger('hammerhal')
+    caplog.set_level(logging.INFO, 'hammerhal')
+
+    assert compile_script.compile_all(logger, jobs=jobs) == 0
+    assert "Build finished: 3 rebuilt, 0 skipped (up to date), 0 failed" in caplog.text
+    assert sorted(BuildManifest().outputs) == [ 'output/other/Green Card.png', 'output/stub/Blue Card.png', 'output/stub/Red Card.png' ]
+
+    # Broken card fails the build, the others are skipped as up to date
+    write_json(project / 'raw' / 'stub' / 'blue.json', { 'name': 'Blue Card', 'color': 'blue', 'fail': True })
+    caplog.clear()
+    assert compile_script.compile_all(logger, jobs=jobs) == 1
+    assert "Build finished: 0 rebuilt, 2 skipped (up to date), 1 failed" in caplog.text
+    # Invalid raw file fails it too
+    write_json(project / 'raw' / 'stub' / 'blue.json', { 'name': 'Blue Card' })
+    assert compile_script.compile_all(logger, jobs=jobs) == 1
+
+    os.remove(str(project / 'raw' / 'stub' / 'blue.json'))
+    caplog.clear()
+    assert compile_script.compile_all(logger, jobs=jobs, force=True) == 0
+    assert "Build finished: 2 rebuilt, 0 skipped (up to date), 0 failed" in caplog.text
+
+def test_crashed_worker_fails_only_its_card(project, monkeypatch, caplog):
+    compile_script = load_compile_script()
+    monkeypatch.setattr(compile_script, 'HeroCompiler', StubCompiler)
+    monkeypatch.setattr(compile_script, 'AdversaryCompiler', OtherStubCompiler)
+    caplog.set_level(logging.INFO, 'hammerhal')
+
+    write_json(project / 'raw' / 'stub' / 'blue.json', { 'name': 'Blue Card', 'color': 'blue', 'crash': True })
+    assert compile_script.compile_all(logging.getLogger('hammerhal'), jobs='2') == 1
+    assert "Worker process crashed" in caplog.text
+    assert "Build finished: 2 rebuilt, 0 skipped (up to date), 1 failed" in caplog.text
+    assert sorted(BuildManifest().outputs) == [ 'output/other/Green Card.png', 'output/stub/Red Card.png' ]
+
+def test_command_line_exit_codes(project):
+    compile_script = load_compile_script()
+    logger = logging.getLogger('hammerhal')
+    assert compile_script.run_command(logger, [ 'all', '--jobs=0' ]) == 3
+    assert compile_script.run_command(logger, [ 'all', '--force=yes' ]) == 3
+    assert compile_script.run_command(logger, [ 'hero', '--jobs=2' ]) == 3
+    assert compile_script.run_command(logger, [ 'unknown' ]) == 3
+    assert compile_script.start([ ]) == 2
@@ -0,0 +1,55 @@
+from hammerhal.compilers.compiler_base import CompilerBase
+
+
+# Records the order the modules are compiled and inserted in
+class RecordingModule:
+    def __init__(self, parent, index, **kwargs):
+        self.parent = parent
+        self.index = index
+        self.kwargs = kwargs
+
+    def compile(self):
+        self.parent.log.append(('compile', self.index))
+        return self
+
+    def insert(self, base):
+        base.append((self.index, self.kwargs))
+
+class TitleModule(RecordingModule):
+    def compile(self):
+        self.parent.title_height = 30
+        return super().compile()
+
+# Placed below the title, so it reads the title height
+class RulesModule(RecordingModule):
+    def compile(self):
+        self.top = self.parent.title_height + 10
+        return super().compile()
+
+class FailingModule(RecordingModule):
+    def compile(self):
+        raise ValueError("Broken module")
+
+class StubCompiler(CompilerBase):
+    compiler_type = 'stub'
+    title_height = None
+
+    def __init__(self, modules):
+        self.modules = modules
+        self.log = [ ]
+
+
+def test_modules_are_compiled_and_inserted_in_order():
+    compiler = StubCompiler([ TitleModule, (RecordingModule, { 'side': 'left' }), RulesModule ])
+    base = [ ]
+    assert compiler.compile_modules(base)
+    assert base == [ (0, { }), (1, { 'side': 'left' }), (2, { }) ]
+    assert compiler.log == [ ('compile', 0), ('compile', 1), ('compile', 2) ]
+    assert compiler.compiled_modules[2].top == 40
+
+def test_failed_module_fails_the_card():
+    compiler = StubCompiler([ RecordingModule, FailingModule, RecordingModule ])
+    base = [ ]
+    assert not compiler.compile_modules(base)
+    assert base == [ (0, { }) ]
+    assert compiler.log == [ ('compile', 0) ]
@@ -0,0 +1,83 @@
+import os, sys, threading
+import pytest
+from PIL import ImageFont
+from fontTools.ttLib import TTFont
+
+from conftest import FONTS_DIRECTORY
+from hammerhal.text_drawer import FontMetrics
+
+FONT_PATH = os.path.join(FONTS_DIRECTORY, 'Lato-Regular.ttf')
+
+# Kerned pairs (AV, Wa, Ty, LT, Yo), punctuation, digits, descenders, accented letters and spaces
+SAMPLES = \
+[
+    'A',
+    'Hello',
+    'AVATAR',
+    'Wave To',
+    'Ty,Te',
+    'LT AT PA Wo Yv',
+    'gypsy fjord',
+    '0123456789',
+    '-+*/!?',
+    'ÄÖÜ äöü',
+    'Lorem ipsum dolor sit amet',
+    ' ',
+]
+
+# Sizes below 25 ppem have the kerning scaled down by FreeType
+SIZES = [ 6, 9, 12, 17, 24, 25, 33, 48, 72 ]
+
+
+@pytest.fixture(scope='module')
+def metrics():
+    return FontMetrics(FONT_PATH, basic_layout=True)
+
+@pytest.mark.parametrize('size', SIZES)
+def test_width_matches_pillow(metrics, size):
+    font = ImageFont.truetype(FONT_PATH, size)
+    for text in SAMPLES:
+        width, _ = metrics.get_text_size(text, size)
+        assert width == font.getlength(text), text
+
+# Heights come from the unhinted glyph bounds, so they could be a pixel off
+@pytest.mark.parametrize('size', SIZES)
+def test_height_matches_pillow(metrics, size):
+    font = ImageFont.truetype(FONT_PATH, size)
+    for text in SAMPLES:
+        _, height = metrics.get_text_size(text, size)
+        assert abs(height - font.getbbox(text)[3]) <= 1, text
+
+def test_empty_text(metrics):
+    assert metrics.get_text_size('', 12) == (0, 0)
+
+# Glyph bounds are read lazily from the shared font, every thread should get the same sizes as the sequential run
+def test_concurrent_text_sizes():
+    # Every glyph of the font, so the threads decompile them at the same time
+    text = ''.join(chr(code) for code in sorted(TTFont(FONT_PATH).getBestCmap()) if chr(code).isprintable())
+    expected = [ FontMetrics(FONT_PATH).get_text_size(text, size) for size in SIZES ]
+    metrics = FontMetrics(FONT_PATH)
+    barrier = threading.Barrier(8)
+    results = [ None ] * 8
+    errors = [ ]
+
+    def measure(i):
+        try:
+            barrier.wait()
+            results[i] = [ metrics.get_text_size(text, size) for size in SIZES ]
+        except Exception as e:
+            errors.append(e)
+
+    _switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [ threading.Thread(target=measure, args=(i,)) for i in range(8) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(_switch_interval)
+
+    assert not errors
+    assert results == [ expected ] * 8
@@ -0,0 +1,31 @@
+import os, json
+from PIL import Image
+
+from hammerhal.compilers.image_exporter import ImageExporter
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'configs', 'compilers.json')
+
+
+def make_image(mode:str):
+    image = Image.new(mode, (360, 240))
+    image.putdata([ ((x * 7) % 256, (y * 5) % 256, (x * y) % 256, 255 - x % 256)[:len(mode)] for y in range(240) for x in range(360) ])
+    return image
+
+def test_default_resize_is_a_single_pass():
+    for mode in ('RGB', 'RGBA'):
+        image = make_image(mode)
+        assert ImageExporter().resize(image, 120).tobytes() == image.resize((120, 80), Image.LANCZOS).tobytes()
+
+def test_reducing_gap_is_opt_in():
+    image = make_image('RGB')
+    reduced = ImageExporter({ 'reducingGap': 1.0 }).resize(image, 120)
+    assert reduced.size == (120, 80)
+    assert reduced.tobytes() != ImageExporter().resize(image, 120).tobytes()
+
+# Shipped configs keep the output of the single pass, the profiles may opt in
+def test_shipped_exports_resample_in_a_single_pass():
+    with open(CONFIG_PATH, encoding='utf-8') as file:
+        config = json.load(file)
+
+    for compiler_type, section in config['compilerTypeSpecific'].items():
+        assert section['export'].get('reducingGap', None) is None, compiler_type
@@ -0,0 +1,29 @@
+from hammerhal.lru_cache import LruCache
+
+
+def test_evicts_least_recently_used_by_size():
+    cache = LruCache('Test', max_size=2)
+    cache.get('a', lambda: 1)
+    cache.get('b', lambda: 2)
+    cache.get('a', lambda: None)
+    cache.get('c', lambda: 3)
+    assert cache.keys() == [ 'a', 'c' ]
+    assert cache.get_stats()['evictions'] == 1
+
+def test_evicts_by_bytes_but_keeps_the_last_value():
+    evicted = [ ]
+    cache = LruCache('Test', max_bytes=10, get_bytes=len, on_evict=lambda key, value: evicted.append(key))
+    cache.get('a', lambda: b'12345')
+    cache.get('b', lambda: b'12345')
+    cache.get('c', lambda: b'123456789012')
+    assert cache.keys() == [ 'c' ]
+    assert evicted == [ 'a', 'b' ]
+    assert cache.get_stats()['bytes'] == 12
+
+def test_invalid_values_are_created_again():
+    cache = LruCache('Test')
+    assert cache.get('a', lambda: (1, 'old')) == (1, 'old')
+    assert cache.get('a', lambda: (2, 'new'), is_valid=lambda value: value[0] == 2) == (2, 'new')
+    assert cache.get('a', lambda: (3, 'newer'), is_valid=lambda value: value[0] == 2) == (2, 'new')
+    assert cache.get_stats()['hits'] == 1
+    assert cache.get_stats()['misses'] == 2
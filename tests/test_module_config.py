@@ -0,0 +1,64 @@
+import pytest
+
+from hammerhal.config_loader import ConfigLoader
+from hammerhal.compilers.module_config import ModuleConfig
+from hammerhal.compilers.compiler_error import CompilerError
+from hammerhal.text_drawer import TextDrawer
+
+SECTION = \
+{
+    'width': 300,
+    'gradient': [ { 'color': '#102030' } ],
+    'borderColor': 'white',
+    'font': { 'fontName': 'Lato', 'fontSize': 20, 'color': 'black', 'horizontalAlignment': 'Justify', 'capitalization': 'SmallCaps' },
+    'fonts': { 'title': { 'fontSize': 30, 'bold': True } },
+}
+
+
+def test_values_colors_and_fonts_are_compiled():
+    config = ModuleConfig('hero', 'rules', SECTION)
+    assert config.get('width') == 300
+    assert config.get('font/fontSize') == 20
+    assert config.get('missing') is None
+    assert config.get_color('gradient/0/color') == (0x10, 0x20, 0x30, 255)
+    assert config.get_color('borderColor') == (255, 255, 255, 255)
+
+    font = config.get_font('font')
+    assert font.font_size == 20
+    assert font.horizontal_alignment == TextDrawer.TextAlignment.Justify
+    assert font.capitalization == TextDrawer.CapitalizationModes.SmallCaps
+    assert font.kwargs == { 'font_name': 'Lato', 'font_size': 20, 'color': (0, 0, 0, 255), 'horizontal_alignment': TextDrawer.TextAlignment.Justify, 'capitalization': TextDrawer.CapitalizationModes.SmallCaps }
+    assert config.get_font('fonts/title').kwargs == { 'font_size': 30, 'bold': True }
+    assert config.get_font('fonts/missing').kwargs == { }
+
+def test_config_is_immutable():
+    config = ModuleConfig('hero', 'rules', SECTION)
+    with pytest.raises(AttributeError):
+        config.values = { }
+    with pytest.raises(AttributeError):
+        config.get_font('font').font_size = 10
+
+@pytest.mark.parametrize('section, message', \
+[
+    ({ 'font': { 'fontSzie': 20 } }, "Unknown font property: compilerTypeSpecific/hero/modules/rules/font/fontSzie"),
+    ({ 'fonts': { 'title': { 'kwargs': { } } } }, "Unknown font property: compilerTypeSpecific/hero/modules/rules/fonts/title/kwargs"),
+    ({ 'font': { 'horizontalAlignment': 'Justfy' } }, "Unknown horizontal_alignment in compilerTypeSpecific/hero/modules/rules/font/horizontalAlignment: 'Justfy'"),
+    ({ 'font': { 'color': 'blak' } }, "Invalid color in compilerTypeSpecific/hero/modules/rules/font/color: 'blak'"),
+    ({ 'gradient': [ { }, { 'color': '#12345' } ] }, "Invalid color in compilerTypeSpecific/hero/modules/rules/gradient/1/color: '#12345'"),
+])
+def test_typos_are_reported_with_the_key_path(section, message):
+    with pytest.raises(CompilerError) as e:
+        ModuleConfig('hero', 'rules', section)
+    assert str(e.value) == message
+
+def test_configs_are_compiled_again_after_reload(monkeypatch):
+    sections = { 'rules': { 'width': 300 }, 'empty': { } }
+    monkeypatch.setattr(ConfigLoader, 'get_from_config', lambda path, config_name='main': sections if (path == 'compilerTypeSpecific/test/modules') else None)
+
+    configs = ModuleConfig.compile_all('test')
+    assert set(configs) == { 'rules' }
+    assert ModuleConfig.compile_all('test') is configs
+
+    sections['rules'] = { 'width': 400 }
+    monkeypatch.setattr(ConfigLoader, 'generation', ConfigLoader.generation + 1)
+    assert ModuleConfig.get_module_config('test', 'rules').get('width') == 400
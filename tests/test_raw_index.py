@@ -0,0 +1,74 @@
+import os, json
+import pytest
+
+from hammerhal.compilers.compiler_base import CompilerBase
+from hammerhal.compilers.raw_index import RawIndex
+
+
+# Raw directory of a compiler type, the constructor does not read the configs
+class StubCompiler(CompilerBase):
+    compiler_type = 'stub'
+
+    def __init__(self, raw_directory:str):
+        self.raw_directory = raw_directory
+
+def write_raw(directory, filename:str, name:str, subtitle:str=None):
+    raw = { 'name': name }
+    if (subtitle):
+        raw['subtitle'] = subtitle
+    with open(os.path.join(directory, filename), 'w', encoding='utf-8') as file:
+        json.dump(raw, file)
+
+@pytest.fixture
+def raw_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(CompilerBase, 'index_directory', str(tmp_path / 'cache'))
+    directory = tmp_path / 'raw'
+    directory.mkdir()
+    write_raw(directory, 'grim.json', 'Grim Adversary', 'Sewer Dweller')
+    write_raw(directory, 'hero.json', 'Test Hero')
+    return str(directory) + os.sep
+
+def get_matches(compiler, query:str):
+    return [ (kind, os.path.basename(path)) for kind, path, _, _ in compiler.get_raw_index().search(query) ]
+
+
+def test_search_by_name_prefix_subtitle_and_fuzzy(raw_directory):
+    compiler = StubCompiler(raw_directory)
+    assert get_matches(compiler, 'test hero') == [ (RawIndex.EXACT, 'hero.json') ]
+    assert get_matches(compiler, 'grim') == [ (RawIndex.EXACT, 'grim.json') ]
+    assert get_matches(compiler, 'Grim Adv') == [ (RawIndex.PREFIX, 'grim.json') ]
+    assert get_matches(compiler, 'dweller') == [ (RawIndex.SUBTITLE, 'grim.json') ]
+    assert get_matches(compiler, 'tset hero') == [ (RawIndex.FUZZY, 'hero.json') ]
+    assert get_matches(compiler, 'nothing like it') == [ ]
+
+def test_index_follows_added_renamed_and_edited_raws(raw_directory):
+    compiler = StubCompiler(raw_directory)
+    assert get_matches(compiler, 'zephyr knight') == [ ]
+
+    write_raw(raw_directory, 'zephyr.json', 'Zephyr Knight')
+    assert get_matches(compiler, 'zephyr knight') == [ (RawIndex.EXACT, 'zephyr.json') ]
+
+    os.rename(os.path.join(raw_directory, 'zephyr.json'), os.path.join(raw_directory, 'renamed.json'))
+    assert get_matches(compiler, 'zephyr knight') == [ (RawIndex.EXACT, 'renamed.json') ]
+
+    write_raw(raw_directory, 'renamed.json', 'Quill Witch')
+    assert get_matches(compiler, 'zephyr knight') == [ ]
+    assert get_matches(compiler, 'quill') == [ (RawIndex.PREFIX, 'renamed.json') ]
+
+def test_index_is_persistent_and_keyed_by_absolute_paths(raw_directory):
+    StubCompiler(raw_directory).get_raw_index()
+    index_files = os.listdir(CompilerBase.index_directory)
+    assert len(index_files) == 1 and index_files[0].startswith('raw_index_stub_')
+
+    index = RawIndex(os.path.join(CompilerBase.index_directory, index_files[0]))
+    assert sorted(index.entries) == [ os.path.join(os.path.abspath(raw_directory), 'grim.json'), os.path.join(os.path.abspath(raw_directory), 'hero.json') ]
+    assert index.entries[os.path.join(os.path.abspath(raw_directory), 'grim.json')]['subtitle'] == 'Sewer Dweller'
+
+def test_every_raw_directory_has_its_own_index(raw_directory, tmp_path):
+    other_directory = tmp_path / 'other_raw'
+    other_directory.mkdir()
+    write_raw(other_directory, 'hero.json', 'Marrow Beast')
+
+    assert get_matches(StubCompiler(raw_directory), 'marrow beast') == [ ]
+    assert get_matches(StubCompiler(str(other_directory) + os.sep), 'marrow beast') == [ (RawIndex.EXACT, 'hero.json') ]
+    assert len(os.listdir(CompilerBase.index_directory)) == 2
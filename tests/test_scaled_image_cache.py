@@ -0,0 +1,68 @@
+import os
+import pytest
+from PIL import Image
+
+from hammerhal.compilers.scaled_image_cache import ScaledImageCache
+
+
+@pytest.fixture
+def cache_directory(tmp_path, monkeypatch):
+    directory = tmp_path / 'scaled'
+    monkeypatch.setattr(ScaledImageCache, 'directory', str(directory))
+    monkeypatch.setattr(ScaledImageCache, 'max_bytes', None)
+    ScaledImageCache.clear()
+    return directory
+
+def make_source(tmp_path, name:str, color):
+    path = str(tmp_path / name)
+    Image.new('RGB', (400, 300), color).save(path)
+    return path
+
+def list_files(directory):
+    return sorted(os.listdir(directory))
+
+
+def test_scaled_images_are_cached(tmp_path, cache_directory):
+    source = make_source(tmp_path, 'a.png', (200, 10, 10))
+    image = ScaledImageCache.get_scaled(source, (40, 30))
+    assert image.size == (40, 30)
+    assert ScaledImageCache.get_scaled(source, (40, 30)).tobytes() == image.tobytes()
+    assert ScaledImageCache.get_stats()['hits'] == 1
+    assert ScaledImageCache.get_stats()['misses'] == 1
+    assert len(list_files(cache_directory)) == 1
+
+def test_least_recently_used_images_are_pruned(tmp_path, cache_directory, monkeypatch):
+    sources = [ make_source(tmp_path, '{i}.png'.format(i=i), (i * 50, 0, 0)) for i in range(3) ]
+    ScaledImageCache.get_scaled(sources[0], (40, 30))
+    _first, = [ os.path.join(cache_directory, _name) for _name in list_files(cache_directory) ]
+    ScaledImageCache.get_scaled(sources[1], (40, 30))
+    _second, = [ os.path.join(cache_directory, _name) for _name in list_files(cache_directory) if os.path.join(cache_directory, _name) != _first ]
+    os.utime(_first, (1, 1))
+    os.utime(_second, (2, 2))
+
+    # The first image is used again, so the second one is the least recently used
+    ScaledImageCache.get_scaled(sources[0], (40, 30))
+    monkeypatch.setattr(ScaledImageCache, 'max_bytes', (os.path.getsize(_first) + os.path.getsize(_second)) * 5 // 4)
+    ScaledImageCache.get_scaled(sources[2], (40, 30))
+    assert len(list_files(cache_directory)) == 2
+    assert os.path.isfile(_first) and not os.path.isfile(_second)
+    assert ScaledImageCache.get_stats()['removed'] == 1
+
+def test_images_of_other_pipeline_versions_are_removed(tmp_path, cache_directory):
+    cache_directory.mkdir()
+    _stale = cache_directory / '0123_40x30_1_g3.0.png'
+    _old_version = cache_directory / '0123_40x30_1_p{pipeline}_g3.0.png'.format(pipeline=ScaledImageCache.PIPELINE_VERSION - 1)
+    for _path in (_stale, _old_version):
+        Image.new('RGB', (40, 30)).save(str(_path))
+
+    ScaledImageCache.get_scaled(make_source(tmp_path, 'a.png', (0, 0, 200)), (40, 30))
+    _files = list_files(cache_directory)
+    assert len(_files) == 1
+    assert '_p{pipeline}_'.format(pipeline=ScaledImageCache.PIPELINE_VERSION) in _files[0]
+
+def test_clear_removes_the_files(tmp_path, cache_directory):
+    ScaledImageCache.get_scaled(make_source(tmp_path, 'a.png', (0, 200, 0)), (40, 30))
+    ScaledImageCache.get_scaled(make_source(tmp_path, 'b.png', (0, 0, 200)), (40, 30))
+    assert ScaledImageCache.clear(files=True) == 2
+    assert list_files(cache_directory) == [ ]
+    assert ScaledImageCache.get_stats()['misses'] == 0
@@ -0,0 +1,94 @@
+import os
+import pytest
+from PIL import Image
+
+from conftest import FONTS_DIRECTORY
+from hammerhal.text_drawer import TextDrawer
+
+FONT_PATH = os.path.join(FONTS_DIRECTORY, 'Lato-Regular.ttf')
+
+
+# Knows only the bundled font, by its file name and by the 'Lato' family (the same file for every style)
+class StubFontFinder:
+    def find_font_file_by_filename(self, filename):
+        return FONT_PATH if (filename == 'Lato-Regular.ttf') else None
+
+    def find_font_file_by_fontname(self, family_name, bold=False, italic=False):
+        return FONT_PATH if (family_name == 'Lato') else None
+
+@pytest.fixture
+def drawer():
+    return TextDrawer(Image.new('RGB', (400, 400)), font_nane='Lato', font_size=20, font_finder=StubFontFinder())
+
+
+def test_over_wide_first_word_takes_one_line(drawer):
+    _, one_line = drawer.get_text_size((0, 0, 400, 400), "Extraordinarily")
+    _, height = drawer.get_text_size((0, 0, 50, 400), "Extraordinarily")
+    assert height == one_line
+
+def test_forced_newline_adds_a_line(drawer):
+    _, one_line = drawer.get_text_size((0, 0, 400, 400), "Some text")
+    _, height = drawer.get_text_size((0, 0, 400, 400), "Some\ntext")
+    assert height == 2 * one_line
+
+def test_justified_lines_fill_the_region(drawer):
+    drawer.set_font(horizontal_alignment='Justify')
+    layout = drawer.get_text_layout((0, 0, 200, 400), "The quick brown fox jumps over the lazy dog again and again")
+    assert len(layout.lines) > 2
+
+    space_width = layout.lines[-1].space_width
+    for line in layout.lines[:-1]:
+        assert line.x == 0
+        assert line.width + (len(line.words) - 1) * (line.space_width - space_width) == pytest.approx(200)
+    # The last line of the paragraph is not stretched
+    assert layout.lines[-1].width < 200
+
+def test_italic_could_be_switched_off(drawer):
+    drawer.set_font(italic=True)
+    drawer.set_font(italic=False)
+    assert drawer.get_font()['italic'] is False
+
+def test_measuring_markup_keeps_the_style(drawer):
+    drawer.get_text_size((0, 0, 400, 400), "**bold** __italic__ __open italic")
+    assert drawer.get_font()['bold'] is False
+    assert drawer.get_font()['italic'] is False
+
+# The baseline looked up 'Times New Roman' after a style toggle of the font loaded by the file name
+def test_font_loaded_by_filename_is_kept_on_style_toggle(drawer):
+    drawer.set_font(font_name='Lato-Regular.ttf')
+    size = drawer.get_text_size((0, 0, 400, 400), "Some text")
+    drawer.set_font(bold=True)
+    drawer.set_font(bold=False)
+    assert drawer.get_font()['font_name'] is None
+    assert drawer.get_text_size((0, 0, 400, 400), "Some text") == size
+
+def test_layout_is_immutable(drawer):
+    layout = drawer.get_text_layout((0, 0, 100, 400), "The quick brown fox jumps")
+    line = layout.lines[0]
+    for obj, key in [ (layout, 'height'), (line, 'x'), (line, 'space_width'), (line.words[0], 'width') ]:
+        with pytest.raises(AttributeError):
+            setattr(obj, key, 0)
+    with pytest.raises(TypeError):
+        layout.font['font_size'] = 30
+    assert isinstance(layout.lines, tuple) and isinstance(line.words, tuple)
+
+def test_layout_prints_with_its_font(drawer):
+    layout = drawer.get_text_layout((0, 0, 200, 400), "Some text")
+    drawer.set_font(font_size=30, vertical_space_scale=0.5)
+    assert drawer.print_layout(layout, (0, 0, 200, 400)) == layout.size
+    assert drawer.get_font()['font_size'] == 30
+
+# The baseline returned the paragraph vertical space as the vertical space scale
+def test_font_state_round_trips(drawer):
+    drawer.set_font(vertical_space_scale=0.25, paragraph_vertical_space=7)
+    font = drawer.get_font()
+    assert font['vertical_space_scale'] == 0.25
+    assert font['paragraph_vertical_space'] == 7
+    drawer.set_font(vertical_space_scale=0.5, paragraph_vertical_space=3)
+    drawer.set_font(**font)
+    assert drawer.get_font() == font
+
+def test_glyphs_are_the_default_render_mode(drawer):
+    assert drawer.render_mode == TextDrawer.RenderModes.PerGlyph
+    runs_drawer = TextDrawer(Image.new('RGB', (400, 400)), font_nane='Lato', font_size=20, font_finder=StubFontFinder(), render_mode='Runs')
+    assert runs_drawer.render_mode == TextDrawer.RenderModes.Runs
@@ -0,0 +1,38 @@
+from hammerhal.text_drawer import MarkupParser, LineBreaker, TextDrawer
+
+OPERANDS = { '$$HA_L': TextDrawer.TextAlignment.Left, '$$HA_J': TextDrawer.TextAlignment.Justify }
+
+
+# Every character is 10 px wide, spaces are 5 px
+def break_text(text:str, max_width:int):
+    line_breaker = LineBreaker(measure_word=lambda word: 10 * len(word.text), space_width=5, max_width=max_width, operands=OPERANDS)
+    return [ line_breaker.break_paragraph(paragraph, TextDrawer.TextAlignment.Left) for paragraph in MarkupParser.parse(text) ]
+
+def get_texts(paragraphs):
+    return [ [ line.get_text() for line in lines ] for lines in paragraphs ]
+
+
+def test_words_are_wrapped_by_width():
+    paragraphs = break_text("aa bb cc dd", max_width=50)
+    assert get_texts(paragraphs) == [ [ 'aa bb', 'cc dd' ] ]
+    assert [ line.width for line in paragraphs[0] ] == [ 45, 45 ]
+
+# The baseline started such paragraphs with an empty line
+def test_over_wide_first_word_is_not_preceded_by_empty_line():
+    paragraphs = break_text("abcdefghij kl", max_width=50)
+    assert get_texts(paragraphs) == [ [ 'abcdefghij', 'kl' ] ]
+    assert paragraphs[0][0].width == 100
+
+def test_over_wide_word_gets_its_own_line():
+    assert get_texts(break_text("ab abcdefghij cd", max_width=50)) == [ [ 'ab', 'abcdefghij', 'cd' ] ]
+
+def test_forced_newline_starts_a_paragraph():
+    assert get_texts(break_text("aa\nbb cc\n\ndd", max_width=100)) == [ [ 'aa' ], [ 'bb cc' ], [ '' ], [ 'dd' ] ]
+
+def test_alignment_operand_applies_to_current_and_next_lines():
+    paragraphs = break_text("aa $$HA_J bb cc dd", max_width=50)
+    assert get_texts(paragraphs) == [ [ 'aa bb', 'cc dd' ] ]
+    assert [ line.horizontal_alignment for line in paragraphs[0] ] == [ TextDrawer.TextAlignment.Justify ] * 2
+
+def test_no_width_limit():
+    assert get_texts(break_text("aa bb cc dd", max_width=None)) == [ [ 'aa bb cc dd' ] ]